@@ -1,28 +1,68 @@
 import asyncio
-from typing import List, Optional, Tuple, Union
+import collections
+import time
+from typing import Callable, List, Optional, Tuple, Union
 
 import discord
 
 from ..globals.custom_types import DiscordReaction
-from ..helpers.helper_functions import get_snowflake
+from ..helpers import metrics, rest_scheduler
+from ..helpers.helper_functions import get_snowflake, wait_for_reactions
 
 # from ..globals.variables import database
 
-games = []
+
+class GameLimitError(RuntimeError):
+    """Raised when no more games can be started."""
 
 
 class Game:
+    # Seconds to wait for more updates before editing the game's message.
+    edit_debounce = 0.25
+
     def __init__(self, ctx):
         self._message: discord.Message = None
         self.ctx = ctx
 
         self._snowflake = get_snowflake(ctx)
+        self.last_used = time.monotonic()
+        self._finish_hooks: List[Callable[["Game"], None]] = []
+
+    def add_finish_hook(self, hook: Callable[["Game"], None]):
+        """Calls a function with the game once it's finished or evicted."""
+        self._finish_hooks.append(hook)
+
+    def finish(self):
+        """Removes the game from the registry so its memory can be released."""
+        registry.finish(self)
+
+    async def modify_game(self, content=None, embed=None) -> Optional[asyncio.Task]:
+        """Sends the game's message, or edits it in the background.
 
-    async def modify_game(self, content=None, embed=None):
+        Keyword Arguments:
+            content {str} -- The message's content. (default: {None})
+            embed {discord.Embed} -- The message's embed. (default: {None})
+
+        Returns:
+            Optional[asyncio.Task] -- The edit, which can be awaited to know if it
+                failed. None if the message was sent instead.
+        """
+        registry.touch(self)
         if self._message is None:
             self._message = await self.ctx.send(content=content, embed=embed)
-        else:
-            await self._message.edit(content=content, embed=embed)
+            return None
+
+        # Not awaited, so updates made in quick succession are sent as one edit.
+        task = rest_scheduler.schedule_edit(
+            self._message, debounce=self.edit_debounce, content=content, embed=embed
+        )
+        task.add_done_callback(self._on_edit_done)
+        return task
+
+    def _on_edit_done(self, task: asyncio.Task):
+        # The game can't go on without its message.
+        if not task.cancelled() and isinstance(task.exception(), discord.NotFound):
+            self.finish()
 
     async def wait_for_reactions(
         self,
@@ -35,77 +75,112 @@ class Game:
         remove_reactions: bool = True,
         remove_reactions_on_timeout: bool = None,
     ) -> discord.Reaction:
-        remove_reactions_on_timeout = (
-            remove_reactions
-            if remove_reactions_on_timeout is None
-            else remove_reactions_on_timeout
+        registry.touch(self)
+        return await wait_for_reactions(
+            self.ctx,
+            self._message if message is None else message,
+            reactions,
+            timeout=timeout,
+            timeout_message=timeout_message,
+            remove_reactions=remove_reactions,
+            remove_reactions_on_timeout=remove_reactions_on_timeout,
         )
 
-        message = self.message if message is None else message
-
-        content = None
-        embed = None
-        if isinstance(timeout_message, (list, tuple)):
-            content, embed = timeout_message
-        elif isinstance(timeout_message, discord.Embed):
-            embed = timeout_message
-        else:
-            content = timeout_message
-
-        if reactions is not None:
-            for reaction in reactions:
-                await message.add_reaction(reaction)
-
-        while True:
-            try:
-                reaction, user = await self.ctx.bot.wait_for(
-                    "reaction_add",
-                    timeout=timeout,
-                    check=lambda reaction, _: reaction.message.id == message.id,
+
+class GameRegistry:
+    """Tracks the running games by snowflake.
+    Games left unused for longer than the idle timeout are finished by a sweeper.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        idle_timeout: float = 600.0,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+
+        # Maps the snowflake to its game, least recently used first.
+        self._games: "collections.OrderedDict[int, Game]" = collections.OrderedDict()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def get(self, snowflake: int) -> Optional[Game]:
+        return self._games.get(snowflake)
+
+    def get_or_create(self, ctx, factory: Callable[..., Game] = Game) -> Game:
+        """Gets the game running where a command was run, starting one if needed.
+
+        Arguments:
+            ctx {commands.Context} -- Information about where a command was run.
+
+        Keyword Arguments:
+            factory {Callable[..., Game]} -- Creates the game. (default: {Game})
+
+        Raises:
+            GameLimitError -- If there are too many games running.
+
+        Returns:
+            Game -- The game.
+        """
+        snowflake = get_snowflake(ctx)
+        game = self._games.get(snowflake)
+        if game is not None:
+            self.touch(game)
+            return game
+
+        if len(self._games) >= self.maxsize:
+            self.sweep()
+            if len(self._games) >= self.maxsize:
+                raise GameLimitError(
+                    "Too many games are running right now, try again later."
                 )
-            except asyncio.TimeoutError:
-                await message.edit(content=content, embed=embed)
-                if reactions is not None and remove_reactions_on_timeout is True:
-                    try:
-                        await message.clear_reactions()
-                    except discord.HTTPException:
-                        for emoji in reactions:
-                            await message.remove_reaction(emoji, self.ctx.bot.user)
-                return None
-
-            if user == self.ctx.bot.user:
-                continue
-
-            if (
-                user == self.ctx.message.author
-                and reaction is not None
-                and (reactions is None or reaction.emoji in reactions)
-            ):
+
+        game = factory(ctx)
+        self._games[snowflake] = game
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(self._sweep())
+        return game
+
+    def touch(self, game: Game):
+        game.last_used = time.monotonic()
+        if self._games.get(game._snowflake) is game:
+            self._games.move_to_end(game._snowflake)
+
+    def finish(self, game: Game):
+        if self._games.get(game._snowflake) is game:
+            del self._games[game._snowflake]
+
+        hooks, game._finish_hooks = game._finish_hooks, []
+        for hook in hooks:
+            hook(game)
+        game._message = None
+
+    def sweep(self):
+        """Finishes the games left unused for longer than the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        # The least recently used games come first.
+        for game in list(self._games.values()):
+            if game.last_used > cutoff:
                 break
+            self.finish(game)
 
-            if reactions is not None and remove_reactions is True:
-                try:
-                    await message.remove_reaction(reaction, user)
-                except (discord.HTTPException, discord.InvalidArgument):
-                    pass
+    async def _sweep(self):
+        # Stops once there are no games left, `get_or_create` starts it again.
+        while self._games:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
 
-        if reactions is not None and remove_reactions is True:
-            try:
-                await message.clear_reactions()
-            except discord.HTTPException:
-                for reaction in reactions:
-                    await message.remove_reaction(self.ctx.bot.user, reaction)
+    def __len__(self) -> int:
+        return len(self._games)
 
-        return reaction
 
+registry = GameRegistry()
 
-def get_game(ctx):
-    global games
+running_games = metrics.registry.gauge("games", "How many games are running.")
+metrics.registry.add_collector("games", lambda: running_games.set(len(registry)))
 
-    snowflake = get_snowflake(ctx)
-    try:
-        return next(game for game in games if game._channel_snowflake == snowflake)
-    except StopIteration as exception:
-        game = Game(ctx)
-        games.append(game)
-        return game
+
+def get_game(ctx) -> Game:
+    return registry.get_or_create(ctx)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+"""Compares the fuzzy scoring backends.
+Run with `python -m src.benchmarks.fuzzy_scoring`.
+"""
+
+import random
+import string
+import timeit
+
+from ..helpers import fuzzy_scoring
+
+corpus_sizes = (1000, 10000, 100000)
+queries = ("quanta", "alic", "david archibald", "xX_gamer_Xx")
+
+
+def random_name(generator: random.Random) -> str:
+    length = generator.randint(3, 24)
+    return "".join(
+        generator.choice(string.ascii_letters + string.digits + " _")
+        for _ in range(length)
+    )
+
+
+def main():
+    generator = random.Random(0)
+    backends = [fuzzy_scoring.PythonScorer()]
+    if fuzzy_scoring.rapidfuzz_process is not None:
+        backends.append(fuzzy_scoring.BatchedScorer())
+    else:
+        print("rapidfuzz isn't installed, only fuzzywuzzy is benchmarked.")
+
+    for size in corpus_sizes:
+        corpus = [random_name(generator) for _ in range(size)]
+        for backend in backends:
+            number = max(1, 10000 // size)
+            elapsed_time = timeit.timeit(
+                lambda: [backend.extract(query, corpus, limit=3) for query in queries],
+                number=number,
+            )
+            per_query = elapsed_time / (number * len(queries)) * 1000
+            print(f"{backend.name:>10} {size:>7} names: {per_query:10.2f}ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 
+import datetime
 import logging
 import re
 import traceback
-from typing import List, Union
+from typing import Union
 
 import discord
 from discord.ext import commands
 
+import humanize
+
 from ..globals import variables
+from ..helpers.bulk_delete import BulkDeleter
 from ..helpers.fuzzy_user import FuzzyUser
 from ..helpers.helper_functions import confirm_action
+from ..helpers.job_registry import registry
 
 
 class AdminCommands:
@@ -20,7 +25,7 @@ class AdminCommands:
 
     def __init__(self) -> None:
         self.database = variables.database
-        self.clearing_channels: List[discord.TextChannel] = []
+        self.jobs = registry
 
     @commands.command(name="Purge", usage="purge (count) (user)")
     @commands.guild_only()
@@ -38,22 +43,31 @@ class AdminCommands:
             fuzzy_user {FuzzyUser} -- Fuzzy user getting (default: {"all"})
         """
 
-        if fuzzy_user is None or (
+        check = None
+        if fuzzy_user is not None and not (
             isinstance(fuzzy_user, str) and fuzzy_user.casefold() == "all"
         ):
-            await ctx.channel.purge(limit=limit)
-            return
+            user, _ = fuzzy_user
 
-        user, _ = fuzzy_user
+            def check_user(message: discord.Message) -> bool:
+                return (
+                    user is None
+                    or message.author == user
+                    or (isinstance(user, str) and user.casefold() == "all")
+                )
 
-        def check_user(message: discord.Message) -> bool:
-            return (
-                user is None
-                or message.author == user
-                or (isinstance(user, str) and user.casefold() == "all")
-            )
+            check = check_user
+
+        try:
+            job = self.jobs.start("purge", ctx.channel, ctx.author)
+        except RuntimeError as exception:
+            await ctx.send(str(exception))
+            return
 
-        await ctx.channel.purge(limit=limit, check=check_user)
+        try:
+            await BulkDeleter(ctx.channel, limit=limit, check=check, job=job).run()
+        finally:
+            self.jobs.finish(job)
 
     @commands.command(name="ClearAll", aliases=["clear-all"], usage="clearall")
     @commands.guild_only()
@@ -70,8 +84,6 @@ class AdminCommands:
         Arguments:
             ctx {commands.Context} -- Information about where the command was run.
         """
-        deleted_message = 0
-
         confirm, confirm_message = await confirm_action(
             ctx, message="Are you sure you want to delete all these messages?"
         )
@@ -80,18 +92,31 @@ class AdminCommands:
             await confirm_message.edit(content="Clearing messages cancelled")
             return
 
+        try:
+            job = self.jobs.start("clear", ctx.channel, ctx.author)
+        except RuntimeError as exception:
+            await confirm_message.edit(content=str(exception))
+            return
+
         prefix = await self.database.get_prefix(ctx)
-        await confirm_message.edit(
-            content=f"Deleting messages... Stop with {prefix}stopclearing"
-        )
-        self.clearing_channels.append(ctx.channel.id)
+        deleting_messages = f"Deleting messages... Stop with {prefix}stopclearing"
+        await confirm_message.edit(content=deleting_messages)
+
+        async def report_progress(deleted: int):
+            await confirm_message.edit(
+                content=f"{deleting_messages}\nDeleted {deleted} messages so far."
+            )
 
-        async for message in ctx.channel.history(limit=None):
-            if ctx.channel.id not in self.clearing_channels:
-                break
-            if message.id != confirm_message.id:
-                await message.delete()
-                deleted_message += 1
+        deleter = BulkDeleter(
+            ctx.channel,
+            skip={confirm_message.id},
+            on_progress=report_progress,
+            job=job,
+        )
+        try:
+            deleted_message = await deleter.run()
+        finally:
+            self.jobs.finish(job)
 
         await confirm_message.delete()
         await ctx.send(content=f"Deleted {deleted_message} messages")
@@ -111,8 +136,64 @@ class AdminCommands:
             ctx {commands.Context} -- Information about where the command was run.
         """
 
-        if ctx.channel.id in self.clearing_channels:
-            self.clearing_channels.remove(ctx.channel.id)
+        job = self.jobs.get_in_channel("clear", ctx.channel.id)
+        if job is not None:
+            job.cancel()
+
+    @commands.group(
+        name="Jobs",
+        usage="jobs (cancel [id])",
+        case_insensitive=True,
+        invoke_without_command=True,
+    )
+    @commands.guild_only()
+    @commands.has_permissions(manage_messages=True)
+    async def jobs_group(self, ctx: commands.Context):
+        """Lists the long-running jobs in this guild.
+
+        Arguments:
+            ctx {commands.Context} -- Information about where the command was run.
+        """
+
+        jobs = self.jobs.in_guild(ctx.guild.id)
+        if not jobs:
+            await ctx.send("There aren't any jobs running.")
+            return
+
+        now = datetime.datetime.utcnow()
+        embed = discord.Embed(title="Jobs", colour=0x0000FF)
+        for job in jobs:
+            running_time = humanize.naturaldelta(now - job.started_at)
+            status = "Cancelling" if job.is_cancelled() else "Running"
+            embed.add_field(
+                name=f"#{job.id} {job.kind}",
+                value=(
+                    f"{status} in <#{job.channel_id}> for {running_time}\n"
+                    f"Started by <@{job.author_id}>, {job.progress} done"
+                ),
+                inline=False,
+            )
+        embed.set_footer(text=f"Cancel a job with {ctx.prefix}jobs cancel [id]")
+        await ctx.send(embed=embed)
+
+    @jobs_group.command(name="Cancel", usage="jobs cancel [id]")
+    @commands.guild_only()
+    @commands.has_permissions(manage_messages=True)
+    async def cancel_job(self, ctx: commands.Context, job_id: int):
+        """Cancels a running job.
+
+        Arguments:
+            ctx {commands.Context} -- Information about where the command was run.
+            job_id {int} -- The job's id from the jobs list.
+        """
+
+        job = self.jobs.get(job_id)
+        if job is None or job.guild_id != ctx.guild.id:
+            await ctx.send(f"There isn't a job #{job_id} running.")
+            return
+
+        job.cancel()
+        await ctx.send(f"Cancelling job #{job_id}.")
 
     @commands.command(name="Kick", usage="kick [user] (reason)")
     @commands.guild_only()
@@ -16,7 +16,7 @@ import tabulate
 
 from ..globals import emojis, variables
 from ..handlers import exit_handling
-from ..helpers import embed_builder
+from ..helpers import embed_builder, simple_paginator
 from ..helpers.helper_functions import confirm_action
 
 exit_handler = exit_handling.get_exit_handler()
@@ -372,6 +372,53 @@ class DeveloperCommands:
                 )
             )
 
+    @commands.command(name="Caches", aliases=["cache-stats"], hidden=True)
+    async def caches(self, ctx: commands.Context):
+        """Shows how well the caches are doing.
+
+        Arguments:
+            ctx {commands.Context} -- Information about where the command was run.
+        """
+
+        caches = {"Prefixes": self.database.prefix_cache.stats()}
+        general_cog = ctx.bot.get_cog("GeneralCommands")
+        if general_cog is not None:
+            caches["Wolfram Alpha"] = general_cog.wolfram_cache.stats()
+
+        embed = discord.Embed(title="Caches", colour=0x0000FF)
+        for name, stats in caches.items():
+            embed.add_field(
+                name=name,
+                value=(
+                    f"{stats['size']}/{stats['maxsize']} entries\n"
+                    f"{stats['hits']} hits, {stats['misses']} misses "
+                    f"({stats['hit_rate']:.1%})\n"
+                    f"{stats['evictions']} evictions"
+                ),
+            )
+
+        if self.database.redis_is_connected:
+            embed.add_field(
+                name="Redis Prefixes",
+                value=(
+                    f"{self.database.redis_hits} hits, "
+                    f"{self.database.redis_misses} misses "
+                    f"({self.database.redis_hit_rate:.1%})"
+                ),
+            )
+
+        paginators = simple_paginator.manager.stats()
+        embed.add_field(
+            name="Paginators",
+            value=(
+                f"{paginators['sessions']}/{paginators['maxsize']} sessions\n"
+                f"~{paginators['bytes']:,} bytes of pages\n"
+                f"{paginators['evictions']} evictions"
+            ),
+        )
+
+        await ctx.send(embed=embed)
+
     @commands.group(name="Git", case_insensitive=True)
     async def git(self, ctx: commands.Context):
         if ctx.invoked_subcommand is None:
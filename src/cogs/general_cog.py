@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import asyncio
-import copy
 import datetime
 import html
 import logging
@@ -9,10 +8,12 @@ import math
 import os
 import random
 import re
+import sqlite3
 import textwrap
 import traceback
 import urllib
-import xml.etree.cElementTree
+from typing import Optional, Tuple
+import xml.etree.ElementTree
 
 import aiohttp
 import discord
@@ -22,11 +23,16 @@ from discord.ext import commands
 
 import humanize
 import ujson
-from fuzzywuzzy import process
 
 from ..globals import emojis, latency, uptime
-from ..helpers import session_helper
+from ..helpers import metrics, rest_scheduler, session_helper
+from ..helpers.cache_helper import LRUCache
 from ..helpers.helper_functions import confirm_action, wait_for_reactions
+from ..helpers.trivia_store import TriviaStore
+
+_missing = object()
+# Trailing sentence punctuation doesn't change a query.
+_query_end_punctuation = "?!. "
 
 
 class GeneralCommands:
@@ -35,6 +41,8 @@ class GeneralCommands:
     icon = "<:quantaperson:473983023797370880>"
 
     def __init__(self, bot: commands.Bot, loop=None) -> None:
+        self._app_id = None
+
         config_path = os.path.join(os.path.dirname(__file__), "../secrets/config.yaml")
         with open(config_path, "r") as config_file:
             try:
@@ -70,17 +78,43 @@ class GeneralCommands:
                 wolfram_alpha = config["wolfram_alpha"]
                 self._app_id = wolfram_alpha["app_id"]
 
-        self._trivia = []
-        self._trivia_count = 25
-        self._trivia_minimum = 5
+        # Questions are prefetched in the background by a single worker.
+        # It refills up to the high watermark whenever the low watermark is reached.
+        self._trivia = asyncio.Queue()
+        self._trivia_low_watermark = 5
+        self._trivia_high_watermark = 25
         self._trivia_packet_size = 5
+        self._trivia_timeout = 15
+        self._trivia_backoff = (1, 300)
+        self._trivia_wanted = asyncio.Event()
         self._trivia_task = None
-        self._trivia_lock = asyncio.Lock()
+        # Questions are served from the store first so restarts don't start empty.
+        self._trivia_store = TriviaStore(loop=loop)
+
+        # Maps a normalized query to its result, including no result.
+        self.wolfram_cache = LRUCache(maxsize=1024, ttl=3600)
+        self._wolfram_queries = {}
+
+        # Rendered help embeds for the current set of extensions.
+        self._help_cache = LRUCache(maxsize=256)
+        self._help_cache_version = None
 
         self.loop = loop or asyncio.get_event_loop()
+        metrics.registry.add_collector("general", self._collect_metrics)
+
+    def _collect_metrics(self):
+        metrics.observe_cache("wolfram", self.wolfram_cache)
+        metrics.observe_cache("help", self._help_cache)
 
     async def on_ready(self):
-        await self.load_trivia()
+        self._start_trivia_worker()
+
+    def __unload(self):
+        metrics.registry.remove_collector("general")
+        if self._trivia_task is not None:
+            self._trivia_task.cancel()
+            self._trivia_task = None
+        self._trivia_store.close()
 
     @commands.command(name="Ping", usage="ping")
     async def ping(self, ctx, round_to=4):
@@ -121,61 +155,19 @@ class GeneralCommands:
             ctx {commands.Context} -- Information about where a command was run.
             command_name {str} -- A command to get specific help. (default: {None})
         """
+        help_cache = self._get_help_cache(ctx.bot)
         if command_name is None:
-            embed = discord.Embed(
-                title="<:quantabadge:473675013786959891> **Help**",
-                color=0x551A8B,  # silver
-                description=textwrap.dedent(
-                    """
-                    Quanta is a multipurpose bot for simplifying your life.
-                    """
-                ),
-            )
-            for name, cog in ctx.bot.cogs.items():
-                title_case_name = re.sub(
-                    "([a-z])(?=[A-Z])", r"\1 ", name
-                )  # Turns PascalCase to Title Case
-                description = ""
-                cog_commands = ctx.bot.get_cog_commands(name)
-                icon = getattr(cog, "icon", None)
-                for cog_command in cog_commands:
-                    command_usage = (
-                        cog_command.usage
-                        if cog_command.usage is not None
-                        else cog_command.name
-                    )
-                    if cog_command.hidden is True:
-                        continue
-                    description += f"**{command_usage}**\n"
-                if description:
-                    header = title_case_name
-                    if icon is not None:
-                        header = f"{icon} {title_case_name}"
-                    embed.add_field(name=header, value=description, inline=True)
-
-            embed.add_field(
-                name="\u200B",
-                value=(
-                    "**Commands are written in the format"
-                    "command [required] (optional)**\n\n"
-                    f"To see more information about a specific command use {ctx.prefix}"
-                    "help (command)"
-                ),
-            )
+            key = ("all", ctx.prefix)
+            embed = help_cache.get(key)
+            if embed is None:
+                embed = self._render_help(ctx.bot, ctx.prefix)
+                help_cache.set(key, embed)
         else:
             command = ctx.bot.get_command(command_name)
 
             if command is None:
-                all_command_names = [
-                    name
-                    for command in ctx.bot.commands
-                    if command.hidden is not True
-                    for name in (*command.aliases, command.name)
-                ]
-
-                closest_command_name, closest_ratio = process.extractOne(
-                    command_name, all_command_names
-                )
+                suggestion = ctx.bot.command_index.suggest(command_name)
+                closest_command_name, closest_ratio = suggestion or (None, 0)
                 could_not_find = (
                     "I couldn't find that command, sorry!"
                     f"Check {ctx.prefix}help for a list of the commands I have."
@@ -208,42 +200,100 @@ class GeneralCommands:
                             )
                         )
                         return
-            if command.help is not None:
-                brief = command.help.split("\n")[0]
-            else:
-                brief = "I can't find any help, sorry."
-            embed = discord.Embed(
-                title=f"{command.qualified_name} Help",
-                color=0x551A8B,
-                description=brief,
-            )
-            embed.add_field(name="Usage", value=command.usage)
-            embed.add_field(
-                name="Aliases",
-                value=", ".join((command.name.lower(), *command.aliases)),
-                inline=True,
-            )
 
-            if isinstance(command, commands.Group):
-                group = command
-                subcommands_description = ""
-                nesting_characters = ["-", "*"]
-                for command in group.walk_commands():
-                    nesting_count = len(command.full_parent_name.split(" "))
-                    nesting_character = nesting_characters[
-                        nesting_count % len(nesting_characters) - 1
-                    ]
-                    tabs = "\t" * (nesting_count - 1) + nesting_character
-
-                    subcommands_description += (
-                        f"{tabs} **{command.usage or command.name.lower()}**\n"
-                    )
-                embed.add_field(
-                    name="Subcommands", value=subcommands_description, inline=False
-                )
+            key = ("command", command.qualified_name)
+            embed = help_cache.get(key)
+            if embed is None:
+                embed = self._render_command_help(command)
+                help_cache.set(key, embed)
 
         await ctx.send(embed=embed)
 
+    def _get_help_cache(self, bot: commands.Bot) -> LRUCache:
+        """Gets the rendered help embeds, emptied whenever the extensions change."""
+        version = getattr(bot, "extensions_version", None)
+        if version != self._help_cache_version:
+            self._help_cache.clear()
+            self._help_cache_version = version
+        return self._help_cache
+
+    def _render_help(self, bot: commands.Bot, prefix: str) -> discord.Embed:
+        embed = discord.Embed(
+            title="<:quantabadge:473675013786959891> **Help**",
+            color=0x551A8B,  # silver
+            description=textwrap.dedent(
+                """
+                Quanta is a multipurpose bot for simplifying your life.
+                """
+            ),
+        )
+        for name, cog in bot.cogs.items():
+            title_case_name = re.sub(
+                "([a-z])(?=[A-Z])", r"\1 ", name
+            )  # Turns PascalCase to Title Case
+            description = ""
+            cog_commands = bot.get_cog_commands(name)
+            icon = getattr(cog, "icon", None)
+            for cog_command in cog_commands:
+                command_usage = (
+                    cog_command.usage
+                    if cog_command.usage is not None
+                    else cog_command.name
+                )
+                if cog_command.hidden is True:
+                    continue
+                description += f"**{command_usage}**\n"
+            if description:
+                header = title_case_name
+                if icon is not None:
+                    header = f"{icon} {title_case_name}"
+                embed.add_field(name=header, value=description, inline=True)
+
+        embed.add_field(
+            name="\u200B",
+            value=(
+                "**Commands are written in the format"
+                "command [required] (optional)**\n\n"
+                f"To see more information about a specific command use {prefix}"
+                "help (command)"
+            ),
+        )
+        return embed
+
+    def _render_command_help(self, command: commands.Command) -> discord.Embed:
+        if command.help is not None:
+            brief = command.help.split("\n")[0]
+        else:
+            brief = "I can't find any help, sorry."
+        embed = discord.Embed(
+            title=f"{command.qualified_name} Help", color=0x551A8B, description=brief
+        )
+        embed.add_field(name="Usage", value=command.usage)
+        embed.add_field(
+            name="Aliases",
+            value=", ".join((command.name.lower(), *command.aliases)),
+            inline=True,
+        )
+
+        if isinstance(command, commands.Group):
+            group = command
+            subcommands_description = ""
+            nesting_characters = ["-", "*"]
+            for command in group.walk_commands():
+                nesting_count = len(command.full_parent_name.split(" "))
+                nesting_character = nesting_characters[
+                    nesting_count % len(nesting_characters) - 1
+                ]
+                tabs = "\t" * (nesting_count - 1) + nesting_character
+
+                subcommands_description += (
+                    f"{tabs} **{command.usage or command.name.lower()}**\n"
+                )
+            embed.add_field(
+                name="Subcommands", value=subcommands_description, inline=False
+            )
+        return embed
+
     @commands.command(name="Uptime", usage="uptime")
     async def uptime(self, ctx: commands.Context):
         """Says how long the bot has been running.
@@ -274,14 +324,13 @@ class GeneralCommands:
         trivia = None
         async with ctx.typing():
             await ctx.message.add_reaction(emojis.loading)
-            trivia = await self.get_trivia(ctx)
+            trivia = await self.get_trivia()
 
         await ctx.message.remove_reaction(emojis.loading, ctx.bot.user)
 
         if trivia is None:
-            logging.warning("get_trivia returned None unexpectedly.")
             await ctx.message.add_reaction(emojis.error)
-            await ctx.send("An unexpected error occurred.")
+            await ctx.send("Sorry, something went wrong with the trivia API.")
             return
 
         category = html.unescape(trivia["category"])
@@ -310,8 +359,7 @@ class GeneralCommands:
         message = await ctx.send(embed=embed)
         number_emojis = emojis.number_emojis[1 : len(answers) + 1]
 
-        too_slow = copy.copy(embed)
-        too_slow.clear_fields()
+        too_slow = discord.Embed(title=category, description=f"{question}")
         too_slow.add_field(
             name="\u200B",
             value=(
@@ -336,9 +384,7 @@ class GeneralCommands:
         correct_number = answers.index(correct_answer)
         correct_emoji = number_emojis[correct_number]
 
-        blank_answers = copy.copy(blank_answers)
-
-        final_answers = copy.copy(blank_answers)
+        final_answers = list(blank_answers)
         for index, answer in enumerate(final_answers):
             if index == correct_number:
                 final_answers[index] = f"{emojis.circle_check} {final_answers[index]}"
@@ -354,7 +400,7 @@ class GeneralCommands:
         else:
             embed.colour = 0xFF0000
 
-        await message.edit(embed=embed)
+        await rest_scheduler.edit(message, embed=embed)
 
     @commands.command(name="Wolfram", usage="wolfram [query]")
     async def wolfram(self, ctx: commands.Context, *, query):
@@ -366,156 +412,262 @@ class GeneralCommands:
                 "Sorry, something went wrong with connecting to Wolfram Alpha."
             )
 
-            query = urllib.parse.quote(query)
-            query_url = (
-                "http://api.wolframalpha.com/v2/query"
-                f"?appid={self._app_id}"
-                f"&input={query}"
-                # "&includepodid=Result"
-                "&format=plaintext"
-            )
-
-            session = await session_helper.get_session()
             try:
-                async with session.get(query_url) as response:
-                    text = await response.text()
-                    try:
-                        response_tree = xml.etree.cElementTree.fromstring(text)
-                    except xml.etree.ElementTree.ParseError as exception:
-                        await ctx.send(something_went_wrong)
-                        logging.warning("Wolfram did not send valid xml.")
-                        raise exception
-                        return
-
-                    result = None
-                    for pod in response_tree:
-                        print(pod)
-                        if pod.id == "result":
-                            result = pod
-                        # print(pod)
-                    # import pprint
-                    # print(pprint.pprint(text))
-                    # print(response_tree[0])
-                    # result_pod = ...
-                    print(result)
+                result = await self.query_wolfram(query)
             except aiohttp.ClientError as exception:
                 await ctx.send(something_went_wrong)
                 logging.warn("Could not connect to WolframAlpha.")
                 raise exception
+            except xml.etree.ElementTree.ParseError as exception:
+                await ctx.send(something_went_wrong)
+                logging.warning("Wolfram did not send valid xml.")
+                raise exception
+
+            if result is None:
+                await ctx.send("Wolfram Alpha doesn't have an answer for that, sorry!")
                 return
 
-            # await ctx.send(plaintext_result)
+        await ctx.send(result)
+
+    async def query_wolfram(self, query: str) -> Optional[str]:
+        """Gets Wolfram Alpha's plaintext result, cached by the normalized query.
+        Identical queries made at the same time share one request.
+        Only answers are cached, failed queries aren't.
 
-    async def get_trivia(self, ctx=None, loop=None):
-        """Gets a trivia question.
-        Not providing ctx makes it error to console.
+        Arguments:
+            query {str} -- What to ask Wolfram Alpha.
+
+        Raises:
+            aiohttp.ClientError -- If Wolfram Alpha couldn't be reached.
+            xml.etree.ElementTree.ParseError -- If the response wasn't valid xml.
+
+        Returns:
+            Optional[str] -- The result, or None if there isn't one.
+        """
+        # The normalized query is only the key, Wolfram Alpha is asked the original.
+        key = normalize_query(query)
+        result = self.wolfram_cache.get(key, _missing)
+        if result is not _missing:
+            return result
+
+        task = self._wolfram_queries.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._query_wolfram(query))
+            self._wolfram_queries[key] = task
+            task.add_done_callback(lambda _: self._wolfram_queries.pop(key, None))
+
+        result, succeeded = await asyncio.shield(task)
+        if succeeded:
+            self.wolfram_cache.set(key, result)
+        return result
+
+    async def _query_wolfram(self, query: str) -> Tuple[Optional[str], bool]:
+        """Returns the result, and whether Wolfram Alpha understood the query.
+        A query that was understood but has no result pod is a real "no result".
+        """
+        query_url = (
+            "http://api.wolframalpha.com/v2/query"
+            f"?appid={self._app_id}"
+            f"&input={urllib.parse.quote(query)}"
+            "&format=plaintext"
+        )
+
+        # The response is parsed as it arrives and closed as soon as the result pod's
+        # plaintext has been read, so the other pods are never downloaded.
+        async with session_helper.stream(query_url) as response:
+            parser = xml.etree.ElementTree.XMLPullParser(events=("start", "end"))
+            pod_id = None
+            succeeded = False
+            async for chunk in response.content.iter_chunked(4096):
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if event == "start" and element.tag == "queryresult":
+                        # Errors and misunderstood queries may succeed next time.
+                        succeeded = (
+                            element.get("success") == "true"
+                            and element.get("error") != "true"
+                        )
+                        if not succeeded:
+                            response.close()
+                            return (None, False)
+                    elif element.tag == "pod":
+                        if event == "start":
+                            pod_id = element.get("id")
+                        else:
+                            pod_id = None
+                            element.clear()
+                    elif (
+                        event == "end"
+                        and element.tag == "plaintext"
+                        and pod_id == "Result"
+                    ):
+                        response.close()
+                        return (element.text or None, succeeded)
+
+            parser.close()
+
+        return (None, succeeded)
+
+    async def get_trivia(self, timeout: float = None):
+        """Gets a trivia question, waiting for the background worker if none are left.
 
         Keyword Arguments:
-            ctx {commands.Context} -- Information about where a command was run.
+            timeout {float} -- How long to wait for a question. (default: {15})
 
         Returns:
-            Object -- The trivia object.
+            Object -- The trivia object, or None if it timed out.
         """
-        loop = loop or self.loop or asyncio.get_running_loop()
+        self._start_trivia_worker()
 
-        if len(self._trivia) == 0:
-            if self._trivia_task is not None:
-                # Wait for the previous trivia task to be done
-                await self._trivia_task
-            else:
-                await self.load_trivia(ctx)
-        elif len(self._trivia) < self._trivia_count:
-            # Let the trivia task run in the background.
-            async def _trivia_callback():
-                async with self._trivia_lock:
-                    self._trivia_task = None
-
-            self._trivia_task = self.loop.create_task(self.load_trivia(ctx))
-            self._trivia_task.add_done_callback(
-                lambda _: self.loop.create_task(_trivia_callback())
+        if self._trivia.qsize() <= self._trivia_low_watermark:
+            self._trivia_wanted.set()
+
+        try:
+            return await asyncio.wait_for(
+                self._trivia.get(), timeout or self._trivia_timeout
+            )
+        except asyncio.TimeoutError:
+            return None
+
+    def _start_trivia_worker(self):
+        if self._trivia_task is None or self._trivia_task.done():
+            self._trivia_wanted.set()
+            self._trivia_task = self.loop.create_task(self._refill_trivia())
+
+    async def _refill_trivia(self):
+        minimum_backoff, maximum_backoff = self._trivia_backoff
+        backoff = minimum_backoff
+
+        # Loading is lazy so it doesn't slow down starting up.
+        try:
+            await self._trivia_store.load()
+        except sqlite3.Error:
+            logging.warning(
+                f"Could not load the trivia store:\n{traceback.format_exc()}"
             )
-            if self._trivia_task.done():
-                self._trivia_task.remove_done_callback()
-                await _trivia_callback()
 
-        return self._trivia.pop()
+        while True:
+            if self._trivia.qsize() > self._trivia_low_watermark:
+                self._trivia_wanted.clear()
+                await self._trivia_wanted.wait()
 
-    async def load_trivia(self, ctx=None):
-        # await asyncio.sleep(10)
-        load_count = self._trivia_count - len(self._trivia)
-        # Round up to self._trivia_load_count, and a minimum of self._trivia_minimum
+            while self._trivia.qsize() < self._trivia_high_watermark:
+                load_count = self._trivia_high_watermark - self._trivia.qsize()
+                stored_questions = self._trivia_store.take(load_count)
+                if stored_questions:
+                    for trivia in stored_questions:
+                        self._trivia.put_nowait(trivia)
+                    continue
+
+                try:
+                    trivia_questions = await self.load_trivia(load_count)
+                except (
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                    jsonschema.exceptions.ValidationError,
+                    ValueError,
+                ):
+                    logging.warning(
+                        f"Could not load trivia, retrying in {backoff} seconds."
+                    )
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, maximum_backoff)
+                    continue
+
+                backoff = minimum_backoff
+                for trivia in trivia_questions:
+                    self._trivia.put_nowait(trivia)
+
+                try:
+                    await self._trivia_store.add(trivia_questions)
+                except sqlite3.Error:
+                    logging.warning(
+                        f"Could not store trivia:\n{traceback.format_exc()}"
+                    )
+
+    async def load_trivia(self, load_count: int) -> list:
+        """Fetches trivia questions from opentdb.
+
+        Arguments:
+            load_count {int} -- How many questions are needed.
+
+        Raises:
+            aiohttp.ClientError -- If opentdb couldn't be reached.
+            ValueError -- If opentdb responded with invalid json.
+            jsonschema.exceptions.ValidationError -- If the json was unexpected.
+
+        Returns:
+            list -- The trivia questions.
+        """
+        # Round up to self._trivia_packet_size.
         load_count = max(
-            self._trivia_minimum,
+            self._trivia_packet_size,
             math.ceil(load_count / self._trivia_packet_size) * self._trivia_packet_size,
         )
 
         url = f"https://opentdb.com/api.php?amount={load_count}"
-        trivia_wrong_format = "Sorry, something went wrong with the trivia API."
         trivia_wrong_format_logging = (
             "opentdb did not respond with the expected format."
         )
 
-        session = await session_helper.get_session()
+        response = await session_helper.fetch(url)
+        if response.status != 200:
+            logging.warning(trivia_wrong_format_logging)
+            raise aiohttp.ClientError(f"opentdb responded with {response.status}.")
+
+        response_text = response.text()
+
         try:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    if ctx is not None:
-                        await ctx.send(trivia_wrong_format)
-                    logging.warning(trivia_wrong_format_logging)
-                    return
+            trivia_response_json = ujson.loads(response_text)
+        except ValueError as exception:
+            logging.warning("opentdb did not send valid json.")
+            raise exception
 
-                response_text = await response.text()
-                try:
-                    trivia_response_json = ujson.loads(response_text)
-                except ValueError as exception:
-                    if ctx is not None:
-                        await ctx.send(trivia_wrong_format)
-                    logging.warning("opentdb did not send valid json.")
-                    raise exception
-
-                response_json_schema = {
-                    "type": "object",
-                    "properties": {
-                        "status": {"type": "number"},
-                        "results": {
-                            "type": "array",
-                            "minItems": load_count,
-                            "maxItems": load_count,
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "category": {"type": "string"},
-                                    "question": {"type": "string"},
-                                    "type": {"type": "string"},
-                                    "correct_answer": {"type": "string"},
-                                    "incorrect_answers": {
-                                        "type": "array",
-                                        "items": {"type": "string"},
-                                    },
-                                },
+        response_json_schema = {
+            "type": "object",
+            "properties": {
+                "status": {"type": "number"},
+                "results": {
+                    "type": "array",
+                    "minItems": load_count,
+                    "maxItems": load_count,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "category": {"type": "string"},
+                            "question": {"type": "string"},
+                            "type": {"type": "string"},
+                            "correct_answer": {"type": "string"},
+                            "incorrect_answers": {
+                                "type": "array",
+                                "items": {"type": "string"},
                             },
                         },
                     },
-                }
+                },
+            },
+        }
 
-                try:
-                    jsonschema.validate(trivia_response_json, response_json_schema)
-                except jsonschema.exceptions.ValidationError as exception:
-                    await ctx.send(self._trivia_wrong_format)
-                    logging.warning(self._trivia_wrong_format_logging)
-                    raise exception
-                    return
+        try:
+            jsonschema.validate(trivia_response_json, response_json_schema)
+        except jsonschema.exceptions.ValidationError as exception:
+            logging.warning(trivia_wrong_format_logging)
+            raise exception
 
-                trivia_questions = trivia_response_json["results"]
+        return trivia_response_json["results"]
 
-                self._trivia.extend(trivia_questions)
 
-        except aiohttp.ClientError as exception:
-            if ctx is not None:
-                await ctx.send(self._trivia_wrong_format)
-            logging.warning("Could not connect to opentdb.")
-            raise exception
-            return
+def normalize_query(query: str) -> str:
+    """Folds the whitespace and trailing punctuation that don't change a query.
+    The query is deliberately not case folded: Wolfram Alpha reads "CO" (carbon
+    monoxide) and "Co" (cobalt) differently, so folding would share their answers.
+    Quotes and primes are kept for the same reason.
+
+    Arguments:
+        query {str} -- The query to normalize.
+    """
+
+    return " ".join(query.split()).rstrip(_query_end_punctuation)
 
 
 def setup(bot: commands.Bot):
@@ -5,8 +5,10 @@ from discord.ext import commands
 
 from ..handlers.exit_handling import ExitHandler
 from ..helpers.database_helper import Database
+from ..helpers.message_filter import MessageFilter
 
 exit_handler: Optional[ExitHandler] = None
 bot: Optional[commands.Bot] = None
 database: Optional[Database] = None
+message_filter: Optional[MessageFilter] = None
 is_ready: bool = False
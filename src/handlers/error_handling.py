@@ -7,8 +7,7 @@ import traceback
 import discord
 from discord.ext import commands
 
-from fuzzywuzzy import process
-
+from ..abc.game import GameLimitError
 from ..globals import emojis, variables
 from ..helpers.helper_functions import wait_for_reactions
 
@@ -56,16 +55,8 @@ class CommandErrorHandler:
         elif isinstance(error, commands.CommandNotFound):
             if ctx.prefix == "":
                 return
-            all_command_names = [
-                name
-                for command in ctx.bot.commands
-                if command.hidden is not True
-                for name in (*command.aliases, command.name)
-            ]
-
-            closest_command_name, closest_ratio = process.extractOne(
-                ctx.invoked_with, all_command_names
-            )
+            suggestion = ctx.bot.command_index.suggest(ctx.invoked_with)
+            closest_command_name, closest_ratio = suggestion or (None, 0)
 
             no_command = f"I don't have the command `{ctx.invoked_with}`, sorry!"
             try_help_command = (
@@ -117,6 +108,8 @@ class CommandErrorHandler:
             await ctx.send(
                 f"Something went wrong on Discord's side. Sorry for the inconvenience."
             )
+        elif isinstance(error, GameLimitError):
+            await ctx.send(str(error))
         elif isinstance(error, commands.NoPrivateMessage):
             try:
                 await ctx.send(
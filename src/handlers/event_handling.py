@@ -3,12 +3,21 @@
 import datetime
 import logging
 import textwrap
+import time
 import traceback
 
 import discord
 from discord.ext import commands
 
 from ..globals import emojis, variables
+from ..helpers import metrics
+
+command_seconds = metrics.registry.histogram(
+    "command_seconds", "How long commands take to run.", ("command",)
+)
+commands_run = metrics.registry.counter(
+    "commands_total", "How many commands were run.", ("command", "status")
+)
 
 
 class BotEventHandler:
@@ -37,8 +46,51 @@ class BotEventHandler:
             status=discord.Status.online, activity=discord.Game(name="?help")
         )
 
+        await self.preload_prefixes()
+
         variables.is_ready = True
 
+    async def preload_prefixes(self):
+        """Warms the prefix cache for every guild before messages are handled."""
+        database = variables.database
+        if database is None or not database.is_connected():
+            return
+
+        start_time = time.perf_counter()
+        try:
+            count = await database.preload_prefixes(
+                str(guild.id) for guild in self.bot.guilds
+            )
+        except Exception:
+            logging.warning(
+                f"Could not preload the prefixes:\n{traceback.format_exc()}"
+            )
+            return
+        elapsed_time = (time.perf_counter() - start_time) * 1000
+
+        self.bot.prefix_warmup_time = elapsed_time
+        logging.info(f"Preloaded {count} prefixes in {elapsed_time:.2f}ms.")
+
+    async def on_command(self, ctx: commands.Context):
+        ctx.started_at = time.perf_counter()
+
+    async def on_command_completion(self, ctx: commands.Context):
+        self.observe_command(ctx, "completed")
+
+    async def on_command_error(self, ctx: commands.Context, error: BaseException):
+        self.observe_command(ctx, "failed")
+
+    @staticmethod
+    def observe_command(ctx: commands.Context, status: str):
+        # Errors raised before the command was invoked, like not finding it, are
+        # left out.
+        if not hasattr(ctx, "started_at"):
+            return
+
+        name = ctx.command.qualified_name
+        commands_run.inc(command=name, status=status)
+        command_seconds.observe(time.perf_counter() - ctx.started_at, command=name)
+
     async def on_error(self, event, *args, **kwargs):
         error = traceback.format_exc()
         logging.warning(error)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import asyncio
+import datetime
+import logging
+from typing import Awaitable, Callable, Collection, List, Optional
+
+import discord
+
+from .job_registry import Job
+
+# Discord can only bulk delete messages younger than 14 days.
+# The margin stops messages from aging past the limit while a batch is collected.
+bulk_delete_age = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+bulk_delete_size = 100
+
+
+class BulkDeleter:
+    """Deletes a channel's messages with as few requests as possible.
+    Messages younger than 14 days are bulk deleted 100 at a time, older ones are
+    deleted one at a time by a few concurrent workers that back off when rate limited.
+    """
+
+    def __init__(
+        self,
+        channel: discord.TextChannel,
+        limit: Optional[int] = None,
+        check: Optional[Callable[[discord.Message], bool]] = None,
+        skip: Collection[int] = (),
+        is_cancelled: Optional[Callable[[], bool]] = None,
+        on_progress: Optional[Callable[[int], Awaitable]] = None,
+        progress_interval: int = 500,
+        concurrency: int = 5,
+        job: Optional[Job] = None,
+    ) -> None:
+        self.channel = channel
+        self.limit = limit
+        self.check = check
+        self.skip = skip
+        self.job = job
+        if is_cancelled is None:
+            is_cancelled = job.is_cancelled if job is not None else (lambda: False)
+        self.is_cancelled = is_cancelled
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.concurrency = concurrency
+
+        self.deleted = 0
+        self._last_progress = 0
+
+    async def run(self) -> int:
+        """Deletes the messages until the history ends or it's cancelled.
+
+        Returns:
+            int -- How many messages were deleted.
+        """
+        cutoff = datetime.datetime.utcnow() - bulk_delete_age
+        batch: List[discord.Message] = []
+        old_messages = asyncio.Queue(maxsize=self.concurrency * 10)
+        workers = [
+            asyncio.ensure_future(self._delete_old_messages(old_messages))
+            for _ in range(self.concurrency)
+        ]
+
+        try:
+            async for message in self.channel.history(limit=self.limit):
+                if self.is_cancelled():
+                    break
+                if message.id in self.skip or (
+                    self.check is not None and not self.check(message)
+                ):
+                    continue
+
+                if message.created_at > cutoff:
+                    batch.append(message)
+                    if len(batch) == bulk_delete_size:
+                        await self._delete_batch(batch)
+                        batch = []
+                else:
+                    # The history is newest first, so the batch is complete and
+                    # sent now, before waiting on the old messages ages it.
+                    if batch:
+                        await self._delete_batch(batch)
+                        batch = []
+                    await old_messages.put(message)
+
+            if batch and not self.is_cancelled():
+                await self._delete_batch(batch)
+
+            for _ in workers:
+                await old_messages.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        return self.deleted
+
+    async def _delete_batch(self, batch: List[discord.Message]):
+        if len(batch) == 1:
+            await self._delete_message(batch[0])
+            return
+
+        try:
+            await self.channel.delete_messages(batch)
+        except discord.HTTPException:
+            # Some were already deleted or became too old to bulk delete,
+            # so they're deleted one at a time.
+            for message in batch:
+                try:
+                    await self._delete_message(message)
+                except discord.HTTPException:
+                    logging.warning(f"Could not delete the message {message.id}.")
+            return
+
+        await self._add_deleted(len(batch))
+
+    async def _delete_old_messages(self, old_messages: asyncio.Queue):
+        while True:
+            message = await old_messages.get()
+            if message is None:
+                return
+            if self.is_cancelled():
+                continue
+            try:
+                await self._delete_message(message)
+            except discord.HTTPException:
+                logging.warning(f"Could not delete the message {message.id}.")
+
+    async def _delete_message(self, message: discord.Message, retries: int = 5):
+        for attempt in range(retries):
+            try:
+                await message.delete()
+            except discord.NotFound:
+                return
+            except discord.HTTPException as exception:
+                if exception.status != 429 or attempt == retries - 1:
+                    raise
+                retry_after = 2 ** attempt
+                logging.info(f"Rate limited while deleting, waiting {retry_after}s.")
+                await asyncio.sleep(retry_after)
+            else:
+                await self._add_deleted(1)
+                return
+
+    async def _add_deleted(self, count: int):
+        self.deleted += count
+        if self.job is not None:
+            self.job.progress = self.deleted
+        if (
+            self.on_progress is not None
+            and self.deleted - self._last_progress >= self.progress_interval
+        ):
+            self._last_progress = self.deleted
+            await self.on_progress(self.deleted)
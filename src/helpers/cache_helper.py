@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import collections
+import time
+from typing import Any, Dict, Hashable, List, Optional
+
+_missing = object()
+
+
+class LRUCache:
+    """A bounded, in-process least recently used cache.
+    Entries can expire after a time to live, and hits and misses are counted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Maps the key to a tuple of (value, expiry time).
+        self._data: "collections.OrderedDict[Hashable, tuple]" = (
+            collections.OrderedDict()
+        )
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Gets a value, marking it as recently used.
+
+        Arguments:
+            key {Hashable} -- The key to look up.
+
+        Keyword Arguments:
+            default {Any} -- Returned when the key is missing or expired. (default: {None})
+
+        Returns:
+            Any -- The cached value or the default.
+        """
+        value = self.peek(key, _missing)
+        if value is _missing:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Gets a value without counting it or changing how recently it was used."""
+        entry = self._data.get(key, None)
+        if entry is None:
+            return default
+
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return default
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Adds or replaces a value, evicting the least recently used one if full.
+
+        Arguments:
+            key {Hashable} -- The key to store the value under.
+            value {Any} -- The value to store.
+
+        Keyword Arguments:
+            ttl {float} -- Overrides the cache's time to live. (default: {None})
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Removes a key. Returns if the key was cached."""
+        return self._data.pop(key, None) is not None
+
+    def values(self) -> List[Any]:
+        """Returns the unexpired values, without marking them as used."""
+        now = time.monotonic()
+        return [
+            value
+            for value, expires in self._data.values()
+            if expires is None or expires > now
+        ]
+
+    def clear(self):
+        self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the cache's counters.
+
+        Returns:
+            Dict[str, Any] -- The size, hits, misses, evictions and hit rate.
+        """
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.peek(key, _missing) is not _missing
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+from typing import List, Optional, Tuple
+
+from discord.ext import commands
+
+from . import fuzzy_scoring
+from .cache_helper import LRUCache
+
+_missing = object()
+
+
+class CommandIndex:
+    """The names and aliases of every visible command, for "did you mean" suggestions.
+    It's rebuilt whenever extensions are loaded or unloaded.
+    """
+
+    def __init__(self, cache_size: int = 512) -> None:
+        self.names: List[str] = []
+        # Maps an invoked name to its suggestion, including no suggestion.
+        self._suggestions = LRUCache(maxsize=cache_size)
+
+    def rebuild(self, bot: commands.Bot):
+        self.names = [
+            name
+            for command in bot.commands
+            if command.hidden is not True
+            for name in (*command.aliases, command.name)
+        ]
+        self._suggestions.clear()
+
+    def suggest(self, invoked_name: str) -> Optional[Tuple[str, int]]:
+        """Gets the closest command name.
+
+        Arguments:
+            invoked_name {str} -- The name that was used.
+
+        Returns:
+            Optional[Tuple[str, int]] -- The closest name and its ratio, if any.
+        """
+        key = invoked_name.casefold()
+        suggestion = self._suggestions.get(key, _missing)
+        if suggestion is _missing:
+            suggestion = fuzzy_scoring.get_scorer().extract_one(key, self.names)
+            self._suggestions.set(key, suggestion)
+
+        return suggestion
@@ -4,6 +4,7 @@ import asyncio
 import logging
 import os
 import traceback
+from typing import Dict, Iterable, Optional
 
 import discord
 import jsonschema
@@ -13,10 +14,23 @@ from discord.ext import commands
 import aioredis
 import asyncpg
 
+from . import metrics
+from .cache_helper import LRUCache
 from .helper_functions import HelperCommands
 
 helperCommands = HelperCommands()
 
+DEFAULT_PREFIX = "?"
+# Every process publishes the snowflake of a changed prefix here.
+PREFIX_INVALIDATION_CHANNEL = "prefix-invalidate"
+
+query_seconds = metrics.registry.histogram(
+    "database_query_seconds", "How long Postgres queries take.", ("query",)
+)
+redis_seconds = metrics.registry.histogram(
+    "redis_command_seconds", "How long Redis commands take.", ("command",)
+)
+
 
 class Database:
     def __init__(
@@ -27,9 +41,22 @@ class Database:
         self._redis = None
         self._redis_ttl = 60
         self._redis_pool = None
+        self.redis_hits = 0
+        self.redis_misses = 0
         self._pool = None
         self._loop = loop
-        self._cache = None
+        self._prefix_cache = LRUCache(maxsize=10000, ttl=300)
+        # The message filter's compiled prefix matchers, invalidated with the prefix.
+        self._matcher_cache = LRUCache(maxsize=10000, ttl=300)
+        # Bumped on every invalidation, so lookups that raced one aren't cached.
+        self._prefix_generations: Dict[str, int] = {}
+        self._lazy_defaults = False
+        self._pending_defaults = set()
+        self._flush_interval = 30
+        self._flush_task = None
+        self._invalidation_channel = None
+        self._invalidation_task = None
+        metrics.registry.add_collector("database", self._collect_metrics)
 
         source = os.path.dirname(os.path.dirname(__file__))
         secrets_path = secrets_path or "secrets/config.yaml"
@@ -81,10 +108,42 @@ class Database:
                 try:
                     jsonschema.validate(config["redis"], redis_scheme)
                 except jsonschema.exceptions.ValidationError:
-                    self._cache = {}
+                    pass
                 else:
                     self._redis_config = config["redis"]
 
+            if "prefix_cache" in config:
+                prefix_cache_scheme = {
+                    "type": "object",
+                    "properties": {
+                        "maxsize": {"type": "integer", "minimum": 1},
+                        "ttl": {"type": ["number", "null"], "minimum": 0},
+                        "lazy_defaults": {"type": "boolean"},
+                        "flush_interval": {"type": "number", "minimum": 0},
+                    },
+                }
+                try:
+                    jsonschema.validate(config["prefix_cache"], prefix_cache_scheme)
+                except jsonschema.exceptions.ValidationError:
+                    logging.warning(
+                        "The prefix_cache config is invalid, using the defaults."
+                    )
+                else:
+                    prefix_cache_config = config["prefix_cache"]
+                    self._prefix_cache = LRUCache(
+                        maxsize=prefix_cache_config.get("maxsize", 10000),
+                        ttl=prefix_cache_config.get("ttl", 300),
+                    )
+                    self._matcher_cache = LRUCache(
+                        maxsize=self._prefix_cache.maxsize, ttl=self._prefix_cache.ttl
+                    )
+                    self._lazy_defaults = prefix_cache_config.get(
+                        "lazy_defaults", False
+                    )
+                    self._flush_interval = prefix_cache_config.get(
+                        "flush_interval", 30
+                    )
+
     async def connect(self):
         """Creates a connection pool.
         Connects to Redis if able to. Silently falls back otherwise.
@@ -119,11 +178,35 @@ class Database:
             except OSError:
                 self._redis_pool = None
                 self._redis = None
-                self._cache = {}
                 logging.warn("Could not connect to Redis with the given credentials.")
+            else:
+                await self._subscribe_to_invalidations()
+
+    async def _subscribe_to_invalidations(self):
+        """Listens for prefix changes made by any Quanta process."""
+        try:
+            (channel,) = await self._redis.subscribe(PREFIX_INVALIDATION_CHANNEL)
+        except aioredis.RedisError:
+            logging.warning(
+                "Could not subscribe to prefix invalidations. "
+                "Prefix changes from other processes may be cached until they expire."
+            )
+            return
+
+        self._invalidation_channel = channel
+        self._invalidation_task = asyncio.ensure_future(
+            self._listen_for_invalidations(channel), loop=self._loop
+        )
+
+    async def _listen_for_invalidations(self, channel):
+        while await channel.wait_message():
+            snowflake = await channel.get(encoding="utf-8")
+            if snowflake is not None:
+                self.invalidate_prefix(snowflake)
 
     async def get_prefix(self, ctx: commands.Context) -> str:
         """Gets the channel's prefix for running with
+        Checks the in-process cache first, then Redis and finally Postgres.
 
         Arguments:
             ctx {commands.Context} -- Information about where the command was run.
@@ -134,39 +217,107 @@ class Database:
         # The function may still be run even if there is no connection
         # because it doesn't have the `with_connection` decorator
         if self._pool is None:
-            return "?"
+            return DEFAULT_PREFIX
 
-        channel = ctx.message.channel
-        if isinstance(channel, discord.abc.PrivateChannel):
-            snowflake = str(channel.id)
-        elif isinstance(channel, discord.abc.GuildChannel):
-            snowflake = str(channel.guild.id)
+        snowflake = self._get_snowflake(ctx)
+        is_private = isinstance(ctx.message.channel, discord.abc.PrivateChannel)
 
+        prefix = self._prefix_cache.get(snowflake)
+        if prefix is not None:
+            return prefix
+
+        generation = self._prefix_generations.get(snowflake, 0)
         if self.redis_is_connected:
-            async with self._redis_pool.get() as connection:
-                transaction = self._redis.multi_exec()
-                prefix = transaction.get(f"channel-{snowflake}")
-                connection.expire(f"channel-{snowflake}", self._redis_ttl)
-                prefix, _ = await transaction.execute()
-        else:
-            prefix = self._cache.get(snowflake, None)
+            prefix = await self._get_redis_prefix(snowflake)
 
         if prefix is None:
             # Calling this directly won't cache it.
-            prefix = await self._get_prefix(snowflake)
-
-            if self.redis_is_connected:
-                async with self._redis_pool.get() as connection:
-                    await connection.execute(
-                        "SETEX", f"channel:{snowflake}", self._redis_ttl, prefix
+            prefix = await self._get_prefix(snowflake, write_default=not is_private)
+
+            if self.redis_is_connected and not self._prefix_changed(
+                snowflake, generation
+            ):
+                with redis_seconds.time(command="setex"):
+                    await self._redis.setex(
+                        self._redis_prefix_key(snowflake), self._redis_ttl, prefix
                     )
-            else:
-                self._cache.set(snowflake, prefix)
         else:
             prefix = prefix.decode("utf-8")
 
+        # The prefix was changed during the lookup, so this one may be stale.
+        if self._prefix_changed(snowflake, generation):
+            return prefix
+
+        self._prefix_cache.set(snowflake, prefix)
+        # A matcher built before the prefix expired may be for a different prefix.
+        self._matcher_cache.delete(snowflake)
         return prefix
 
+    @staticmethod
+    def _redis_prefix_key(snowflake: str) -> str:
+        # Prefixes are stored as `prefix:{snowflake}` following the `type:id` scheme.
+        return f"prefix:{snowflake}"
+
+    async def _get_redis_prefix(self, snowflake: str) -> Optional[bytes]:
+        """Gets a prefix from Redis and refreshes its expiry in one round trip."""
+        key = self._redis_prefix_key(snowflake)
+        pipeline = self._redis.pipeline()
+        pipeline.get(key)
+        pipeline.expire(key, self._redis_ttl)
+        with redis_seconds.time(command="get_expire"):
+            prefix, _ = await pipeline.execute()
+
+        if prefix is None:
+            self.redis_misses += 1
+        else:
+            self.redis_hits += 1
+        return prefix
+
+    @property
+    def redis_hit_rate(self) -> float:
+        lookups = self.redis_hits + self.redis_misses
+        return self.redis_hits / lookups if lookups else 0.0
+
+    def _collect_metrics(self):
+        metrics.observe_cache("prefix", self._prefix_cache)
+        metrics.cache_hit_ratio.set(self.redis_hit_rate, cache="redis_prefix")
+        metrics.cache_lookups.set_total(
+            self.redis_hits, cache="redis_prefix", result="hit"
+        )
+        metrics.cache_lookups.set_total(
+            self.redis_misses, cache="redis_prefix", result="miss"
+        )
+
+    @property
+    def prefix_cache(self) -> LRUCache:
+        return self._prefix_cache
+
+    @property
+    def matcher_cache(self) -> LRUCache:
+        return self._matcher_cache
+
+    def invalidate_prefix(self, snowflake: str):
+        """Drops a prefix and its matcher from the in-process caches."""
+        self._prefix_generations[snowflake] = (
+            self._prefix_generations.get(snowflake, 0) + 1
+        )
+        self._prefix_cache.delete(snowflake)
+        self._matcher_cache.delete(snowflake)
+
+    def _prefix_changed(self, snowflake: str, generation: int) -> bool:
+        return self._prefix_generations.get(snowflake, 0) != generation
+
+    @classmethod
+    def _get_snowflake(cls, ctx: commands.Context) -> str:
+        return cls.get_channel_snowflake(ctx.message.channel)
+
+    @staticmethod
+    def get_channel_snowflake(channel: discord.abc.Messageable) -> str:
+        if isinstance(channel, discord.abc.PrivateChannel):
+            return str(channel.id)
+        elif isinstance(channel, discord.abc.GuildChannel):
+            return str(channel.guild.id)
+
     def acquire(self, timeout=None):
         return asyncpg.pool.PoolAcquireContext(self._pool, timeout)
 
@@ -178,22 +329,114 @@ class Database:
     async def redis_connection(self):
         return self._redis_pool.get()
 
-    async def _get_prefix(self, snowflake: int) -> str:
+    async def _get_prefix(self, snowflake: str, write_default: bool = True) -> str:
         async with self.acquire() as connection:
-            row = await connection.fetchrow(
-                "SELECT prefix FROM prefixes WHERE snowflake=$1", snowflake
+            with query_seconds.time(query="select_prefix"):
+                row = await connection.fetchrow(
+                    "SELECT prefix FROM prefixes WHERE snowflake=$1", snowflake
+                )
+
+        if row is not None:
+            return row["prefix"]
+
+        # A missing row means the default prefix, so it's only written to
+        # keep the table complete. Private channels are never written.
+        if write_default:
+            if self._lazy_defaults:
+                self._queue_default_prefixes(snowflake)
+            else:
+                async with self.acquire() as connection:
+                    async with connection.transaction():
+                        with query_seconds.time(query="insert_default_prefix"):
+                            await connection.execute(
+                                "INSERT INTO prefixes VALUES ($1, $2) "
+                                "ON CONFLICT (snowflake) DO NOTHING",
+                                snowflake,
+                                DEFAULT_PREFIX,
+                            )
+
+        return DEFAULT_PREFIX
+
+    def _queue_default_prefixes(self, *snowflakes: str):
+        self._pending_defaults.update(snowflakes)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(
+                self._flush_default_prefixes_later(), loop=self._loop
             )
 
-            if row is None:
+    async def _flush_default_prefixes_later(self):
+        await asyncio.sleep(self._flush_interval)
+        try:
+            await self.flush_default_prefixes()
+        except Exception:
+            logging.warning(
+                f"Could not write the default prefixes:\n{traceback.format_exc()}"
+            )
+
+    async def flush_default_prefixes(self):
+        """Writes the queued default prefixes in one batch."""
+        if not self._pending_defaults or self._pool is None:
+            return
+
+        snowflakes = self._pending_defaults
+        self._pending_defaults = set()
+        try:
+            async with self.acquire() as connection:
                 async with connection.transaction():
-                    # Default prefix is "?"
-                    await connection.execute(
-                        "INSERT INTO prefixes VALUES ($1, $2)", snowflake, "?"
+                    with query_seconds.time(query="insert_default_prefixes"):
+                        await connection.executemany(
+                            "INSERT INTO prefixes VALUES ($1, $2) "
+                            "ON CONFLICT (snowflake) DO NOTHING",
+                            [(snowflake, DEFAULT_PREFIX) for snowflake in snowflakes],
+                        )
+        except Exception:
+            # Keep them for the next batch.
+            self._pending_defaults |= snowflakes
+            raise
+
+    async def preload_prefixes(
+        self, snowflakes: Iterable[str], chunk_size: int = 1000
+    ) -> int:
+        """Loads many prefixes into the cache with as few queries as possible.
+
+        Arguments:
+            snowflakes {Iterable[str]} -- The guild and channel snowflakes to load.
+
+        Keyword Arguments:
+            chunk_size {int} -- How many snowflakes to query at once. (default: {1000})
+
+        Returns:
+            int -- How many prefixes were cached.
+        """
+        if self._pool is None:
+            return 0
+
+        snowflakes = list(snowflakes)
+        missing = set(snowflakes)
+        async with self.acquire() as connection:
+            for start in range(0, len(snowflakes), chunk_size):
+                with query_seconds.time(query="select_prefixes"):
+                    rows = await connection.fetch(
+                        "SELECT snowflake, prefix FROM prefixes "
+                        "WHERE snowflake = ANY($1)",
+                        snowflakes[start : start + chunk_size],
                     )
+                for row in rows:
+                    self._prefix_cache.set(row["snowflake"], row["prefix"])
+                    self._matcher_cache.delete(row["snowflake"])
+                    missing.discard(row["snowflake"])
 
-                return "?"
+        for snowflake in missing:
+            self._prefix_cache.set(snowflake, DEFAULT_PREFIX)
 
-            return row["prefix"]
+        if missing:
+            if self._lazy_defaults:
+                self._queue_default_prefixes(*missing)
+            else:
+                self._pending_defaults.update(missing)
+                await self.flush_default_prefixes()
+
+        return len(snowflakes)
 
     async def set_prefix(self, ctx: commands.Context, prefix: str):
         """Sets the server prefix.
@@ -209,23 +452,29 @@ class Database:
             if not isinstance(prefix, str):
                 prefix = str(prefix)
 
-            channel = ctx.message.channel
-            if isinstance(channel, discord.abc.PrivateChannel):
-                snowflake = str(channel.id)
-            elif isinstance(channel, discord.abc.GuildChannel):
-                snowflake = str(channel.guild.id)
+            snowflake = self._get_snowflake(ctx)
 
+            # The row may not exist yet if the default prefix was never written.
+            self._pending_defaults.discard(snowflake)
             async with connection.transaction():
-                await connection.execute(
-                    "UPDATE prefixes SET prefix=$1 WHERE prefixes.snowflake=$2",
-                    prefix,
-                    snowflake,
-                )
-                if self.redis_is_connected():
-                    async with self._redis_pool.get() as connection:
-                        await connection.execute("SET", f"channel:{snowflake}", prefix)
-                else:
-                    self._cache.set(snowflake, prefix)
+                with query_seconds.time(query="upsert_prefix"):
+                    await connection.execute(
+                        "INSERT INTO prefixes VALUES ($1, $2) "
+                        "ON CONFLICT (snowflake) DO UPDATE SET prefix=EXCLUDED.prefix",
+                        snowflake,
+                        prefix,
+                    )
+                if self.redis_is_connected:
+                    with redis_seconds.time(command="setex"):
+                        await self._redis.setex(
+                            self._redis_prefix_key(snowflake), self._redis_ttl, prefix
+                        )
+
+            # The next lookup will load the new prefix.
+            self.invalidate_prefix(snowflake)
+            if self.redis_is_connected:
+                with redis_seconds.time(command="publish"):
+                    await self._redis.publish(PREFIX_INVALIDATION_CHANNEL, snowflake)
 
     def is_connected(self) -> bool:
         """Returns if the database is connected or not.
@@ -241,13 +490,30 @@ class Database:
         if self._pool is None:
             raise RuntimeWarning("The connection has already been closed.")
 
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        try:
+            await self.flush_default_prefixes()
+        except Exception:
+            logging.warning(
+                f"Could not write the default prefixes:\n{traceback.format_exc()}"
+            )
+
         if timeout not in (0, -1, None):
             await asyncio.wait_for(self._pool.close(), timeout)
 
         if self._pool is not None:
             self._pool.terminate()
 
-        if self.redis_is_connected():
+        if self._invalidation_task is not None:
+            self._invalidation_task.cancel()
+            self._invalidation_task = None
+
+        if self.redis_is_connected:
+            if self._invalidation_channel is not None:
+                await self._redis.unsubscribe(PREFIX_INVALIDATION_CHANNEL)
+                self._invalidation_channel = None
             self._redis_pool.close()
 
         self._pool = None
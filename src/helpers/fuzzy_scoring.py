@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+from fuzzywuzzy import process as fuzzywuzzy_process
+
+try:
+    from rapidfuzz import process as rapidfuzz_process
+    from rapidfuzz import utils as rapidfuzz_utils
+except ImportError:
+    rapidfuzz_process = None
+    rapidfuzz_utils = None
+
+
+class PythonScorer:
+    """Scores each choice one at a time with fuzzywuzzy."""
+
+    name = "fuzzywuzzy"
+
+    def extract(
+        self, query: str, choices: Sequence[str], limit: int = 5
+    ) -> List[Tuple[str, int]]:
+        return fuzzywuzzy_process.extract(query, choices, limit=limit)
+
+    def extract_one(
+        self, query: str, choices: Sequence[str]
+    ) -> Optional[Tuple[str, int]]:
+        return fuzzywuzzy_process.extractOne(query, choices)
+
+
+class BatchedScorer:
+    """Scores every choice in one native call with rapidfuzz.
+    The scores are rounded so they compare the same as fuzzywuzzy's.
+    """
+
+    name = "rapidfuzz"
+
+    def extract(
+        self, query: str, choices: Sequence[str], limit: int = 5
+    ) -> List[Tuple[str, int]]:
+        results = rapidfuzz_process.extract(
+            query, choices, limit=limit, processor=rapidfuzz_utils.default_process
+        )
+        return [(choice, round(score)) for choice, score, _ in results]
+
+    def extract_one(
+        self, query: str, choices: Sequence[str]
+    ) -> Optional[Tuple[str, int]]:
+        result = rapidfuzz_process.extractOne(
+            query, choices, processor=rapidfuzz_utils.default_process
+        )
+        if result is None:
+            return None
+
+        choice, score, _ = result
+        return (choice, round(score))
+
+
+scorers = {PythonScorer.name: PythonScorer, BatchedScorer.name: BatchedScorer}
+scorer = BatchedScorer() if rapidfuzz_process is not None else PythonScorer()
+
+
+def configure(backend: Optional[str] = None):
+    """Chooses the scoring backend.
+    Falls back to fuzzywuzzy if the backend is unknown or not installed.
+
+    Keyword Arguments:
+        backend {str} -- "rapidfuzz" or "fuzzywuzzy". (default: {the fastest})
+    """
+    global scorer
+
+    if backend is None:
+        backend = BatchedScorer.name if rapidfuzz_process is not None else None
+    elif backend not in scorers:
+        logging.warning(f'Unknown fuzzy backend "{backend}", using fuzzywuzzy.')
+        backend = None
+    elif backend == BatchedScorer.name and rapidfuzz_process is None:
+        logging.warning("rapidfuzz isn't installed, using fuzzywuzzy.")
+        backend = None
+
+    scorer = scorers.get(backend, PythonScorer)()
+
+
+def get_scorer():
+    return scorer
@@ -5,10 +5,9 @@ from typing import Optional, Tuple
 import discord
 from discord.ext import commands
 
-from fuzzywuzzy import process
-
 from ..globals import emojis
 from ..globals.custom_types import DiscordUser
+from . import member_index
 from .helper_functions import wait_for_reactions
 
 
@@ -56,13 +55,8 @@ class FuzzyUser(commands.Converter):
         if identifier.startswith("<@") and identifier.endswith(">"):
             identifier = identifier[2:-1]
 
-        compares = [
-            name
-            for member in ctx.guild.members
-            for name in (str(member.id), member.name, member.nick)
-            if name is not None
-        ]
-        results = process.extract(identifier, compares, limit=result_count)
+        index = member_index.get_index(ctx.guild)
+        results = index.search(identifier, limit=result_count)
         results = [result for result in results if result[1] > 5]
         result_count = len(results)
 
@@ -123,6 +117,28 @@ class FuzzyUser(commands.Converter):
 
 
 class GetUser:
+    # Keeps the member indexes used by `FuzzyUser` up to date.
+    async def on_member_join(self, member: discord.Member):
+        index = member_index.indexes.get(member.guild.id)
+        if index is not None:
+            index.add(member)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if (before.name, before.nick) == (after.name, after.nick):
+            return
+
+        index = member_index.indexes.get(after.guild.id)
+        if index is not None:
+            index.add(after)
+
+    async def on_member_remove(self, member: discord.Member):
+        index = member_index.indexes.get(member.guild.id)
+        if index is not None:
+            index.remove(member)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        member_index.remove_index(guild)
+
     @commands.command(
         name="GetUser",
         usage="getuser [user]",
@@ -8,6 +8,7 @@ from discord.ext import commands
 
 from ..globals import emojis
 from ..globals.custom_types import DiscordChannel, DiscordReaction
+from . import reaction_dispatcher, rest_scheduler
 from .embed_builder import EmbedBuilder
 
 build_embed = EmbedBuilder()
@@ -129,12 +130,13 @@ async def confirm_action(
         message = message[0]
 
     if base_message is not None:
-        confirm = base_message.edit(content=message, embed=embed)
+        confirm = base_message
+        await rest_scheduler.edit(confirm, content=message, embed=embed)
     else:
         try:
             confirm = await ctx.send(content=message, embed=embed)
         except discord.HTTPException:
-            return (False, confirm)
+            return (False, None)
 
     reaction = await wait_for_reactions(ctx, confirm, (emojis.yes, emojis.no))
 
@@ -167,49 +169,49 @@ async def wait_for_reactions(
     else:
         content = timeout_message
 
-    if reactions is not None:
-        for reaction in reactions:
-            await message.add_reaction(reaction)
+    # Only this message's reactions are routed to the waiter.
+    with reaction_dispatcher.subscribe(message) as waiter:
+        if reactions is not None:
+            # Listening starts while the reactions are still being added.
+            rest_scheduler.add_reactions(message, reactions)
 
-    while True:
-        try:
-            reaction, user = await ctx.bot.wait_for(
-                "reaction_add",
-                timeout=timeout,
-                check=lambda reaction, _: reaction.message.id == message.id,
-            )
-        except asyncio.TimeoutError:
-            await message.edit(content=content, embed=embed)
-            if reactions is not None and remove_reactions_on_timeout is True:
-                try:
-                    await message.clear_reactions()
-                except discord.HTTPException:
-                    for emoji in reactions:
-                        await message.remove_reaction(emoji, ctx.bot.user)
-            return None
-
-        if user == ctx.bot.user:
-            continue
-
-        if (
-            user == ctx.message.author
-            and reaction is not None
-            and (reactions is None or reaction.emoji in reactions)
-        ):
-            break
-
-        if reactions is not None and remove_reactions is True:
+        while True:
             try:
-                await message.remove_reaction(reaction, user)
-            except (discord.HTTPException, discord.InvalidArgument):
-                pass
+                reaction, user = await waiter.wait(timeout)
+            except asyncio.TimeoutError:
+                rest_scheduler.cancel_reactions(message)
+                await rest_scheduler.edit(message, content=content, embed=embed)
+                if reactions is not None and remove_reactions_on_timeout is True:
+                    try:
+                        await message.clear_reactions()
+                    except discord.HTTPException:
+                        for emoji in reactions:
+                            await message.remove_reaction(emoji, ctx.bot.user)
+                return None
+
+            if user == ctx.bot.user:
+                continue
+
+            if (
+                user == ctx.message.author
+                and reaction is not None
+                and (reactions is None or reaction.emoji in reactions)
+            ):
+                break
+
+            if reactions is not None and remove_reactions is True:
+                try:
+                    await message.remove_reaction(reaction, user)
+                except (discord.HTTPException, discord.InvalidArgument):
+                    pass
 
+    rest_scheduler.cancel_reactions(message)
     if reactions is not None and remove_reactions is True:
         try:
             await message.clear_reactions()
         except discord.HTTPException:
-            for reaction in reactions:
-                await message.remove_reaction(ctx.bot.user, reaction)
+            for emoji in reactions:
+                await message.remove_reaction(emoji, ctx.bot.user)
 
     return reaction
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import datetime
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+
+class Job:
+    """A long-running moderation job, such as clearing a channel."""
+
+    __slots__ = (
+        "id",
+        "kind",
+        "channel_id",
+        "guild_id",
+        "author_id",
+        "started_at",
+        "progress",
+        "cancelled",
+    )
+
+    def __init__(
+        self, id: int, kind: str, channel_id: int, guild_id: int, author_id: int
+    ) -> None:
+        self.id = id
+        self.kind = kind
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.started_at = datetime.datetime.utcnow()
+        self.progress = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled
+
+
+class JobRegistry:
+    """Tracks the running jobs by id and by kind and channel, both in O(1)."""
+
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, Job] = {}
+        self._by_channel: Dict[Tuple[str, int], Job] = {}
+
+    def start(self, kind: str, channel, author) -> Job:
+        """Registers a job.
+
+        Arguments:
+            kind {str} -- What the job does, such as "clear".
+            channel {discord.abc.GuildChannel} -- Where the job is running.
+            author {discord.abc.User} -- Who started the job.
+
+        Raises:
+            RuntimeError -- If a job of the same kind is running in the channel.
+
+        Returns:
+            Job -- The job, which should be finished with `finish`.
+        """
+        key = (kind, channel.id)
+        if key in self._by_channel:
+            raise RuntimeError(f"A {kind} job is already running in this channel.")
+
+        guild = getattr(channel, "guild", None)
+        job = Job(
+            next(self._ids),
+            kind,
+            channel.id,
+            guild.id if guild is not None else None,
+            author.id,
+        )
+        self._jobs[job.id] = job
+        self._by_channel[key] = job
+        return job
+
+    def finish(self, job: Job):
+        self._jobs.pop(job.id, None)
+        if self._by_channel.get((job.kind, job.channel_id)) is job:
+            del self._by_channel[(job.kind, job.channel_id)]
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def get_in_channel(self, kind: str, channel_id: int) -> Optional[Job]:
+        return self._by_channel.get((kind, channel_id))
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a job. Returns if the job was running."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def in_guild(self, guild_id: int) -> List[Job]:
+        return [job for job in self._jobs.values() if job.guild_id == guild_id]
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+registry = JobRegistry()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import collections
+from typing import Dict, Iterable, List, Set
+
+import discord
+
+from . import fuzzy_scoring
+
+indexes: Dict[int, "MemberIndex"] = {}
+
+
+def trigrams(text: str) -> Set[str]:
+    # Padding lets short names and the start of names match.
+    text = f"  {text.casefold()} "
+    return {text[index : index + 3] for index in range(len(text) - 2)}
+
+
+class MemberIndex:
+    """A trigram index of a guild's member ids, names and nicknames.
+    Candidates sharing the most trigrams with a query are scored exactly.
+    """
+
+    def __init__(self, members: Iterable[discord.Member] = ()) -> None:
+        # Maps a member's id to the names they can be found by.
+        self._names: Dict[int, List[str]] = {}
+        # Maps a trigram to the names containing it.
+        self._postings: Dict[str, Set[str]] = collections.defaultdict(set)
+        # Maps a name to how many members have it, so shared names are kept.
+        self._name_counts: Dict[str, int] = collections.Counter()
+
+        for member in members:
+            self.add(member)
+
+    def add(self, member: discord.Member):
+        names = [
+            name
+            for name in (str(member.id), member.name, member.nick)
+            if name is not None
+        ]
+        self.remove(member)
+        self._names[member.id] = names
+        for name in names:
+            self._name_counts[name] += 1
+            if self._name_counts[name] == 1:
+                for trigram in trigrams(name):
+                    self._postings[trigram].add(name)
+
+    def remove(self, member: discord.Member):
+        names = self._names.pop(member.id, None)
+        if names is None:
+            return
+
+        for name in names:
+            self._name_counts[name] -= 1
+            if self._name_counts[name] > 0:
+                continue
+
+            del self._name_counts[name]
+            for trigram in trigrams(name):
+                posting = self._postings.get(trigram)
+                if posting is None:
+                    continue
+                posting.discard(name)
+                if not posting:
+                    del self._postings[trigram]
+
+    def search(self, query: str, limit: int = 3, candidates: int = 50) -> List[tuple]:
+        """Finds the names closest to the query.
+
+        Arguments:
+            query {str} -- What to search for.
+
+        Keyword Arguments:
+            limit {int} -- How many results to return. (default: {3})
+            candidates {int} -- How many names to score exactly. (default: {50})
+
+        Returns:
+            List[tuple] -- The (name, score) pairs, best first.
+        """
+        shared = collections.Counter()
+        for trigram in trigrams(query):
+            shared.update(self._postings.get(trigram, ()))
+
+        if not shared:
+            return []
+
+        closest = [name for name, _ in shared.most_common(candidates)]
+        return fuzzy_scoring.get_scorer().extract(query, closest, limit=limit)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+def get_index(guild: discord.Guild) -> MemberIndex:
+    """Gets a guild's member index, building it the first time it's used."""
+    index = indexes.get(guild.id)
+    if index is None:
+        index = MemberIndex(guild.members)
+        indexes[guild.id] = index
+    return index
+
+
+def remove_index(guild: discord.Guild):
+    indexes.pop(guild.id, None)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import collections
+from typing import Optional
+
+import discord
+from discord.ext import commands
+
+from . import metrics, prefix_matcher
+from .database_helper import DEFAULT_PREFIX, Database
+
+
+filtered_messages = metrics.registry.counter(
+    "message_filter_messages_total",
+    "How many messages each filter stage dropped, and how many passed.",
+    ("stage",),
+)
+
+
+class fake_ctx(object):
+    message: discord.Message = ...
+
+
+class MessageFilter:
+    """Drops messages that can't be commands, cheapest checks first.
+    Only messages that pass every stage need the command pipeline.
+    """
+
+    stages = ("bot", "empty", "initial", "prefix")
+
+    def __init__(self, bot: commands.Bot, database: Database) -> None:
+        self.bot = bot
+        self.database = database
+        # How many messages each stage dropped, and how many passed.
+        self.stats = collections.Counter(
+            {stage: 0 for stage in (*self.stages, "passed")}
+        )
+        metrics.registry.add_collector("message_filter", self._collect_metrics)
+
+    def _collect_metrics(self):
+        for stage, count in self.stats.items():
+            filtered_messages.set_total(count, stage=stage)
+
+    async def get_matcher(
+        self, message: discord.Message
+    ) -> prefix_matcher.PrefixMatcher:
+        """Gets the prefix matcher for where the message was sent.
+
+        Arguments:
+            message {discord.Message} -- The message to get the prefixes for.
+
+        Returns:
+            prefix_matcher.PrefixMatcher -- The matcher for the guild or channel.
+        """
+        matcher = self.get_cached_matcher(message)
+        if matcher is not None:
+            return matcher
+
+        # I have to fake `commands.Context` because `get_context` requires the
+        # prefix, which would call this and create an infinite loop.
+        ctx: fake_ctx = fake_ctx()
+        ctx.message = message
+        prefix = await self.database.get_prefix(ctx)
+
+        matcher = self._get_matcher(message, prefix)
+        if self.database.is_connected():
+            snowflake = self.database.get_channel_snowflake(message.channel)
+            self.database.matcher_cache.set(snowflake, matcher)
+        return matcher
+
+    def get_cached_matcher(
+        self, message: discord.Message
+    ) -> Optional[prefix_matcher.PrefixMatcher]:
+        """Gets the matcher only if it doesn't need a prefix lookup."""
+        if not self.database.is_connected():
+            return self._get_matcher(message, DEFAULT_PREFIX)
+
+        snowflake = self.database.get_channel_snowflake(message.channel)
+        return self.database.matcher_cache.get(snowflake)
+
+    async def filter(self, message: discord.Message) -> Optional[str]:
+        """Checks if a message could be a command.
+
+        Arguments:
+            message {discord.Message} -- The message to check.
+
+        Returns:
+            Optional[str] -- The message's prefix, or None if it was dropped.
+        """
+        if message.author.bot:
+            self.stats["bot"] += 1
+            return None
+
+        content = message.content
+        if not content:
+            self.stats["empty"] += 1
+            return None
+
+        # Checking the first character doesn't need a lookup if it's cached.
+        matcher = self.get_cached_matcher(message)
+        if matcher is not None:
+            if matcher.initials is not None and content[0] not in matcher.initials:
+                self.stats["initial"] += 1
+                return None
+        else:
+            matcher = await self.get_matcher(message)
+
+        prefix = matcher.match(content)
+        if prefix is None:
+            self.stats["prefix"] += 1
+            return None
+
+        self.stats["passed"] += 1
+        return prefix
+
+    def _get_matcher(
+        self, message: discord.Message, prefix: str
+    ) -> prefix_matcher.PrefixMatcher:
+        # This enables the use of no prefixes in PrivateChannels by default.
+        is_private = isinstance(message.channel, discord.abc.PrivateChannel)
+        return prefix_matcher.get_matcher(self.bot.user.id, prefix, is_private)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+"""Counters, gauges and histograms, exported in the Prometheus text format.
+Metrics are labelled with keyword arguments, for example
+`commands.inc(command="help", status="completed")`.
+"""
+
+import logging
+import math
+import time
+import traceback
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+from .cache_helper import LRUCache
+
+# The upper bounds of the default histogram buckets, in seconds.
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    labels = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return f"{{{labels}}}" if labels else ""
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Maps the label values to the value.
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} is labelled by {self.labelnames}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def clear(self):
+        self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for key, value in self._values.items():
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """A total that only goes up, such as how many commands were run."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can't be decreased.")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, total: float, **labels):
+        """Sets the total, for counts kept elsewhere and copied by a collector."""
+        self._values[self._key(labels)] = total
+
+
+class Gauge(Metric):
+    """A value that can go up and down, such as how many paginators are open."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Histogram(Metric):
+    """Counts observations, such as latencies, into buckets.
+    Percentiles can be estimated from the buckets with `histogram_quantile`.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Iterable[float] = default_buckets,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Maps the label values to the bucket counts, sum and count.
+        self._observations: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        observations = self._observations.get(key)
+        if observations is None:
+            observations = [[0] * len(self.buckets), 0.0, 0]
+            self._observations[key] = observations
+
+        bucket_counts = observations[0]
+        for index, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                bucket_counts[index] += 1
+                break
+        observations[1] += value
+        observations[2] += 1
+
+    def time(self, **labels) -> _Timer:
+        """Observes how many seconds a `with` block takes."""
+        return _Timer(self, labels)
+
+    def get(self, **labels) -> float:
+        observations = self._observations.get(self._key(labels))
+        return observations[2] if observations is not None else 0
+
+    def clear(self):
+        self._observations.clear()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        labelnames = self.labelnames + ("le",)
+        for key, (bucket_counts, total, count) in self._observations.items():
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative_count += bucket_count
+                labels = _format_labels(
+                    labelnames, key + (_format_value(upper_bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative_count}")
+
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Holds the metrics and the collectors that update them before each export."""
+
+    def __init__(self, prefix: str = "quanta_") -> None:
+        self.prefix = prefix
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: Dict[str, Callable[[], None]] = {}
+
+    def _register(self, metric_type: type, name: str, *args, **kwargs) -> Metric:
+        name = self.prefix + name
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = metric_type(name, *args, **kwargs)
+            self._metrics[name] = metric
+        elif not isinstance(metric, metric_type):
+            raise ValueError(f"{name} is already a {metric.type_name}.")
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()
+    ) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Iterable[float] = default_buckets,
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def add_collector(self, name: str, collector: Callable[[], None]):
+        """Calls a function before each export, to update metrics that are read
+        from elsewhere, such as cache sizes. Replaces any collector with the name.
+
+        Arguments:
+            name {str} -- The collector's name, used to remove it.
+            collector {Callable[[], None]} -- Updates the metrics.
+        """
+        self._collectors[name] = collector
+
+    def remove_collector(self, name: str):
+        self._collectors.pop(name, None)
+
+    def collect(self):
+        for name, collector in list(self._collectors.items()):
+            try:
+                collector()
+            except Exception:
+                logging.warning(
+                    f"The {name} metrics collector failed:\n{traceback.format_exc()}"
+                )
+
+    def render(self) -> str:
+        """Exports the metrics in the Prometheus text format.
+
+        Returns:
+            str -- The exported metrics.
+        """
+        self.collect()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+cache_hit_ratio = registry.gauge(
+    "cache_hit_ratio", "How many lookups were cache hits.", ("cache",)
+)
+cache_lookups = registry.counter(
+    "cache_lookups_total",
+    "How many times the cache was looked up.",
+    ("cache", "result"),
+)
+cache_entries = registry.gauge(
+    "cache_entries", "How many entries are cached.", ("cache",)
+)
+
+
+def observe_cache(name: str, cache: LRUCache):
+    """Updates the cache gauges from a cache's counters, for use in collectors."""
+    cache_hit_ratio.set(cache.hit_rate, cache=name)
+    cache_lookups.set_total(cache.hits, cache=name, result="hit")
+    cache_lookups.set_total(cache.misses, cache=name, result="miss")
+    cache_entries.set(len(cache), cache=name)
+
+
+_runner: Optional[web.AppRunner] = None
+
+
+async def _export(request: web.Request) -> web.Response:
+    return web.Response(
+        text=registry.render(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def start_server(host: str = "127.0.0.1", port: int = 9150, path="/metrics"):
+    """Serves the metrics over HTTP, for Prometheus to scrape.
+
+    Keyword Arguments:
+        host {str} -- The address to listen on. (default: {"127.0.0.1"})
+        port {int} -- The port to listen on. (default: {9150})
+        path {str} -- Where the metrics are served. (default: {"/metrics"})
+    """
+    global _runner
+
+    if _runner is not None:
+        return
+
+    app = web.Application()
+    app.router.add_get(path, _export)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _runner = runner
+    logging.info(f"Serving metrics on http://{host}:{port}{path}.")
+
+
+async def stop_server():
+    global _runner
+
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
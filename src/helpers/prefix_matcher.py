@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import re
+from typing import Optional, Tuple
+
+from .cache_helper import LRUCache
+
+# Matchers are shared by every guild and channel with the same prefixes.
+_matchers = LRUCache(maxsize=256)
+
+
+class PrefixMatcher:
+    """Matches every prefix a message can start with in a single regex call.
+    The prefixes are tried in order, the same as discord.py does.
+    """
+
+    __slots__ = ("prefixes", "prefix_list", "initials", "_pattern")
+
+    def __init__(self, prefixes: Tuple[str, ...]) -> None:
+        self.prefixes = prefixes
+        self.prefix_list = list(prefixes)
+        # None means a prefix is empty, so any character can start a command.
+        self.initials = (
+            None if "" in prefixes else frozenset(prefix[0] for prefix in prefixes)
+        )
+        self._pattern = re.compile("|".join(re.escape(prefix) for prefix in prefixes))
+
+    def match(self, content: str) -> Optional[str]:
+        """Gets the prefix the content starts with.
+
+        Arguments:
+            content {str} -- The message content.
+
+        Returns:
+            Optional[str] -- The matched prefix, or None if there isn't one.
+        """
+        match = self._pattern.match(content)
+        if match is None:
+            return None
+        return match.group(0)
+
+
+def get_matcher(bot_id: int, prefix: str, is_private: bool = False) -> PrefixMatcher:
+    """Gets the matcher for a prefix, building it only the first time it's used.
+
+    Arguments:
+        bot_id {int} -- The bot's user id, used for the mention prefixes.
+        prefix {str} -- The guild or channel's custom prefix.
+
+    Keyword Arguments:
+        is_private {bool} -- If no prefix is also allowed. (default: {False})
+
+    Returns:
+        PrefixMatcher -- The matcher for the mentions and the prefix.
+    """
+    # The same mentions as `commands.when_mentioned`.
+    prefixes = (f"<@{bot_id}> ", f"<@!{bot_id}> ", prefix)
+    if is_private and prefix != "":
+        prefixes += ("",)
+
+    matcher = _matchers.get(prefixes)
+    if matcher is None:
+        matcher = PrefixMatcher(prefixes)
+        _matchers.set(prefixes, matcher)
+    return matcher
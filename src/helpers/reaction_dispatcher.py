@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""Routes reactions to whatever is waiting on the reacted message.
+`bot.wait_for("reaction_add")` runs every waiter's check against every reaction,
+this looks up the message's waiters by id instead.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import discord
+from discord.ext import commands
+
+from ..globals.custom_types import DiscordUser
+from . import metrics
+
+ReactionCallback = Callable[[discord.Reaction, DiscordUser], Awaitable]
+
+
+class ReactionWaiter:
+    """Receives the reactions added to a message.
+    Use it as a context manager so it stops listening when it's done.
+    """
+
+    __slots__ = ("dispatcher", "message_id", "queue")
+
+    def __init__(
+        self, dispatcher: "ReactionDispatcher", message_id: int, maxsize: int = 100
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.message_id = message_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def wait(
+        self, timeout: float = None
+    ) -> Tuple[discord.Reaction, DiscordUser]:
+        """Waits for the next reaction.
+
+        Keyword Arguments:
+            timeout {float} -- Seconds to wait for. (default: {None})
+
+        Raises:
+            asyncio.TimeoutError -- If no reaction was added in time.
+
+        Returns:
+            Tuple[discord.Reaction, DiscordUser] -- The reaction and who added it.
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.dispatcher.unsubscribe(self)
+
+    def __enter__(self) -> "ReactionWaiter":
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+
+class ReactionDispatcher:
+    def __init__(self) -> None:
+        self._waiters: Dict[int, List[ReactionWaiter]] = {}
+        # Callbacks are for long-lived listeners, which don't need a task waiting.
+        self._callbacks: Dict[int, ReactionCallback] = {}
+        self.dispatched = 0
+        # Reactions a waiter had no room left for.
+        self.dropped = 0
+
+    def subscribe(self, message: discord.Message) -> ReactionWaiter:
+        """Starts receiving the reactions added to a message.
+
+        Arguments:
+            message {discord.Message} -- The message to listen to.
+
+        Returns:
+            ReactionWaiter -- The waiter, which should be closed when it's done.
+        """
+        waiter = ReactionWaiter(self, message.id)
+        self._waiters.setdefault(message.id, []).append(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter: ReactionWaiter):
+        waiters = self._waiters.get(waiter.message_id)
+        if waiters is None or waiter not in waiters:
+            return
+
+        waiters.remove(waiter)
+        if not waiters:
+            del self._waiters[waiter.message_id]
+
+    def add_callback(self, message: discord.Message, callback: ReactionCallback):
+        """Calls a coroutine function with each reaction added to a message.
+
+        Arguments:
+            message {discord.Message} -- The message to listen to.
+            callback {ReactionCallback} -- Called with the reaction and its user.
+        """
+        self._callbacks[message.id] = callback
+
+    def remove_callback(self, message: discord.Message):
+        self._callbacks.pop(message.id, None)
+
+    def dispatch(self, reaction: discord.Reaction, user: DiscordUser):
+        callback = self._callbacks.get(reaction.message.id)
+        if callback is not None:
+            asyncio.ensure_future(self._run_callback(callback, reaction, user))
+            self.dispatched += 1
+
+        waiters = self._waiters.get(reaction.message.id)
+        if waiters is None:
+            return
+
+        for waiter in waiters:
+            try:
+                waiter.queue.put_nowait((reaction, user))
+            except asyncio.QueueFull:
+                self.dropped += 1
+            else:
+                self.dispatched += 1
+
+    @staticmethod
+    async def _run_callback(
+        callback: ReactionCallback, reaction: discord.Reaction, user: DiscordUser
+    ):
+        try:
+            await callback(reaction, user)
+        except Exception as exception:
+            logging.warning(
+                f"A reaction callback for {reaction.message.id} failed: {exception}"
+            )
+
+    @property
+    def active_waiters(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def stats(self) -> dict:
+        return {
+            "messages": len(self._waiters),
+            "waiters": self.active_waiters,
+            "callbacks": len(self._callbacks),
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+        }
+
+
+dispatcher = ReactionDispatcher()
+
+reaction_waiters = metrics.registry.gauge(
+    "reaction_waiters", "How many waiters and callbacks are listening.", ("kind",)
+)
+reactions_routed = metrics.registry.counter(
+    "reactions_routed_total",
+    "How many reactions were dispatched or dropped.",
+    ("result",),
+)
+
+
+def _collect_metrics():
+    stats = dispatcher.stats()
+    reaction_waiters.set(stats["waiters"], kind="waiter")
+    reaction_waiters.set(stats["callbacks"], kind="callback")
+    reactions_routed.set_total(stats["dispatched"], result="dispatched")
+    reactions_routed.set_total(stats["dropped"], result="dropped")
+
+
+metrics.registry.add_collector("reaction_dispatcher", _collect_metrics)
+
+
+def subscribe(message: discord.Message) -> ReactionWaiter:
+    return dispatcher.subscribe(message)
+
+
+class ReactionDispatching:
+    # Feeds every reaction to the dispatcher.
+    async def on_reaction_add(self, reaction: discord.Reaction, user: DiscordUser):
+        dispatcher.dispatch(reaction, user)
+
+
+def setup(bot: commands.Bot):
+    bot.add_cog(ReactionDispatching())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+"""Schedules reaction and edit requests so interactive messages don't wait on them.
+discord.py already waits out each route's rate limit bucket, this avoids making
+the caller wait for requests it doesn't need the result of, or that are redundant.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List
+
+import discord
+
+from ..globals.custom_types import DiscordReaction
+
+_reaction_tasks: Dict[int, asyncio.Task] = {}
+_edit_lanes: Dict[int, "_EditLane"] = {}
+
+skipped_edits = 0
+
+
+class _EditLane:
+    """The edit in flight for a message, and the latest edit waiting behind it."""
+
+    __slots__ = ("pending", "waiters")
+
+    def __init__(self) -> None:
+        self.pending: dict = None
+        self.waiters: List[asyncio.Future] = []
+
+
+def add_reactions(
+    message: discord.Message, reactions: Iterable[DiscordReaction]
+) -> asyncio.Task:
+    """Adds reactions in the background, in order, so the caller can listen already.
+
+    Arguments:
+        message {discord.Message} -- The message to react to.
+        reactions {Iterable[DiscordReaction]} -- The reactions to add.
+
+    Returns:
+        asyncio.Task -- The task adding the reactions.
+    """
+    cancel_reactions(message)
+    task = asyncio.ensure_future(_add_reactions(message, tuple(reactions)))
+    _reaction_tasks[message.id] = task
+
+    def forget(_):
+        if _reaction_tasks.get(message.id) is task:
+            del _reaction_tasks[message.id]
+
+    task.add_done_callback(forget)
+    return task
+
+
+async def _add_reactions(message: discord.Message, reactions: tuple):
+    for reaction in reactions:
+        try:
+            await message.add_reaction(reaction)
+        except discord.HTTPException:
+            return
+
+
+def cancel_reactions(message: discord.Message):
+    """Stops adding reactions, such as before the reactions are cleared."""
+    task = _reaction_tasks.pop(message.id, None)
+    if task is not None:
+        task.cancel()
+
+
+def _is_unchanged(message: discord.Message, name: str, value: Any) -> bool:
+    # Compared with the message itself, which discord.py updates after every edit,
+    # so edits made without the scheduler are taken into account too.
+    if name == "content":
+        return ("" if value is None else str(value)) == (message.content or "")
+    if name == "embed":
+        embeds = message.embeds
+        if value is None:
+            return not embeds
+        return len(embeds) == 1 and embeds[0].to_dict() == value.to_dict()
+    return False
+
+
+def _changed_fields(message: discord.Message, fields: dict) -> dict:
+    return {
+        name: value
+        for name, value in fields.items()
+        if not _is_unchanged(message, name, value)
+    }
+
+
+async def edit(message: discord.Message, debounce: float = 0.0, **fields):
+    """Edits a message. While an edit is in flight, later edits are merged and
+    only the latest fields are sent once it's done. Fields the message already has
+    are left out, and if nothing changed nothing is sent.
+
+    Arguments:
+        message {discord.Message} -- The message to edit.
+        fields -- The fields to pass to `discord.Message.edit`.
+
+    Keyword Arguments:
+        debounce {float} -- Seconds to wait for more edits before sending one.
+            (default: {0.0})
+    """
+    lane = _edit_lanes.get(message.id)
+    if lane is None:
+        lane = _EditLane()
+        _edit_lanes[message.id] = lane
+        asyncio.ensure_future(_run_edit_lane(message, lane, debounce))
+
+    if lane.pending is None:
+        lane.pending = fields
+    else:
+        lane.pending.update(fields)
+
+    waiter = asyncio.get_event_loop().create_future()
+    lane.waiters.append(waiter)
+    await waiter
+
+
+def schedule_edit(
+    message: discord.Message, debounce: float = 0.0, **fields
+) -> asyncio.Task:
+    """Edits a message in the background, see `edit`.
+    Edits scheduled within the debounce window are sent as one edit.
+
+    Arguments:
+        message {discord.Message} -- The message to edit.
+        fields -- The fields to pass to `discord.Message.edit`.
+
+    Keyword Arguments:
+        debounce {float} -- Seconds to wait for more edits before sending one.
+            (default: {0.0})
+
+    Returns:
+        asyncio.Task -- The task editing the message.
+    """
+    task = asyncio.ensure_future(edit(message, debounce, **fields))
+    task.add_done_callback(_log_edit_error)
+    return task
+
+
+def _log_edit_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.warning(f"Could not edit a message: {task.exception()}")
+
+
+async def _run_edit_lane(message: discord.Message, lane: _EditLane, debounce: float):
+    global skipped_edits
+
+    try:
+        if debounce > 0:
+            await asyncio.sleep(debounce)
+
+        while lane.pending is not None:
+            fields, lane.pending = lane.pending, None
+            waiters, lane.waiters = lane.waiters, []
+            try:
+                fields = _changed_fields(message, fields)
+                if fields:
+                    await message.edit(**fields)
+                else:
+                    skipped_edits += 1
+            except Exception as exception:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(exception)
+            else:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+    finally:
+        del _edit_lanes[message.id]
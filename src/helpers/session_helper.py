@@ -1,16 +1,161 @@
+import asyncio
+import time
+import urllib.parse
+from typing import Dict, NamedTuple, Union
+
 import aiohttp
 
+from . import metrics
+
 session = None
 
+# The connector's total and per-host connection limits, 0 means unlimited.
+connection_limit = 100
+connection_limit_per_host = 10
+
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+request_seconds = metrics.registry.histogram(
+    "http_request_seconds", "How long HTTP requests take to respond.", ("host",)
+)
+responses = metrics.registry.counter(
+    "http_responses_total",
+    "How many HTTP responses were received.",
+    ("host", "status"),
+)
+
+
+class Response(NamedTuple):
+    """A fully read response, so it outlives the connection it was read from."""
+
+    status: int
+    body: bytes
+    content_type: str
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding)
+
+
+def configure(limit: int = None, limit_per_host: int = None):
+    """Configures the shared session. Only affects sessions created afterwards.
+
+    Keyword Arguments:
+        limit {int} -- How many connections can be open. (default: {100})
+        limit_per_host {int} -- The limit for each host, 0 is unlimited. (default: {10})
+    """
+    global connection_limit, connection_limit_per_host
+
+    if limit is not None:
+        connection_limit = limit
+    if limit_per_host is not None:
+        connection_limit_per_host = limit_per_host
+
 
 async def get_session() -> aiohttp.ClientSession:
     global session
     if session is None:
-        session = aiohttp.ClientSession()
+        connector = aiohttp.TCPConnector(
+            limit=connection_limit, limit_per_host=connection_limit_per_host
+        )
+        session = aiohttp.ClientSession(connector=connector)
 
     return session
 
 
+class _Unlimited:
+    """Stands in for a host's semaphore when hosts aren't limited."""
+
+    async def acquire(self) -> bool:
+        return True
+
+    def release(self):
+        pass
+
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, exception_type, exception, traceback):
+        pass
+
+
+_unlimited = _Unlimited()
+
+
+def get_host_semaphore(url: str) -> Union[asyncio.Semaphore, _Unlimited]:
+    # Like the connector's limit_per_host, 0 doesn't limit the host.
+    if connection_limit_per_host == 0:
+        return _unlimited
+
+    host = urllib.parse.urlsplit(url).netloc
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(connection_limit_per_host)
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+
+async def fetch(url: str) -> Response:
+    """Gets a url through the shared session, within the host's concurrency limit.
+
+    Arguments:
+        url {str} -- The url to get.
+
+    Raises:
+        aiohttp.ClientError -- If the request failed.
+
+    Returns:
+        Response -- The read response.
+    """
+    session = await get_session()
+    async with get_host_semaphore(url):
+        start_time = time.perf_counter()
+        async with session.get(url) as response:
+            body = await response.read()
+            _observe_response(url, response.status, start_time)
+            return Response(response.status, body, response.content_type)
+
+
+def _observe_response(url: str, status: int, start_time: float):
+    host = urllib.parse.urlsplit(url).netloc
+    request_seconds.observe(time.perf_counter() - start_time, host=host)
+    responses.inc(host=host, status=status)
+
+
+class StreamedRequest:
+    """Opens a response without reading it, within the host's concurrency limit.
+    Use `stream(url)` as an async context manager.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._semaphore = get_host_semaphore(url)
+        self._request = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        await self._semaphore.acquire()
+        try:
+            session = await get_session()
+            start_time = time.perf_counter()
+            self._request = session.get(self.url)
+            response = await self._request.__aenter__()
+            # Streamed responses are timed until their headers arrive.
+            _observe_response(self.url, response.status, start_time)
+            return response
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def __aexit__(self, exception_type, exception, traceback):
+        try:
+            await self._request.__aexit__(exception_type, exception, traceback)
+        finally:
+            self._semaphore.release()
+
+
+def stream(url: str) -> StreamedRequest:
+    return StreamedRequest(url)
+
+
 async def close_session():
     global session
 
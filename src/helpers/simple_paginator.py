@@ -3,20 +3,31 @@
 """Code by Myst(EvieePy)"""
 
 import asyncio
-from typing import List
+import collections
+import json
+import time
+from typing import Dict, List, Optional
 
 import discord
 
-
-async def pager(entries, chunk: int):
-    for x in range(0, len(entries), chunk):
-        yield entries[x : x + chunk]
+from . import metrics, reaction_dispatcher, rest_scheduler
+from .cache_helper import LRUCache
 
 
 class SimplePaginator:
+    """Paginates entries with reactions, rendering each page when it's first shown.
+
+    The entries can be a sequence (`entries`), an async iterable (`source`), or a
+    coroutine function taking a page index and length and returning that page's
+    entries (`fetch_page`). When there's no way of knowing how many pages there
+    are, pages are titled "3/?" until the last one is found.
+    """
 
     __slots__ = (
         "entries",
+        "source",
+        "fetch_page",
+        "total",
         "extras",
         "title",
         "description",
@@ -29,8 +40,12 @@ class SimplePaginator:
         "timeout",
         "ordered",
         "controls",
-        "controller",
+        "ctx",
+        "lock",
+        "last_used",
         "pages",
+        "chunks",
+        "exhausted",
         "current",
         "previous",
         "eof",
@@ -40,6 +55,11 @@ class SimplePaginator:
 
     def __init__(self, **kwargs) -> None:
         self.entries = kwargs.get("entries", None)
+        source = kwargs.get("source", None)
+        self.source = source.__aiter__() if source is not None else None
+        self.fetch_page = kwargs.get("fetch_page", None)
+        # How many entries `fetch_page` has, if it's known.
+        self.total = kwargs.get("total", None)
         self.extras = kwargs.get("extras", None)
 
         self.title = kwargs.get("title", None)
@@ -54,89 +74,186 @@ class SimplePaginator:
         self.timeout = kwargs.get("timeout", 90)
         self.ordered = kwargs.get("ordered", False)
 
-        self.controller = None
-        self.pages: List[discord.Embed] = []
+        self.ctx = None
+        # Stops reactions added in quick succession from changing pages at once.
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        # The recently shown pages, by index.
+        self.pages = LRUCache(maxsize=kwargs.get("cache_size", 10))
+        # The chunks read from `source` so far, as it can't be read again.
+        self.chunks: List[List] = []
+        self.exhausted = False
         self.names: List = []
         self.base = None
 
         self.current = 0
         self.previous = 0
-        self.eof = 0
+        # The last page's index, or None until it's known.
+        self.eof: Optional[int] = None
+
+        self.controls = {"⏮": 0, "◀": -1, "⏹": "stop", "▶": +1, "⏭": None}
+
+    @property
+    def extra_pages(self) -> List[discord.Embed]:
+        if not self.extras:
+            return []
+        return [page for page in self.extras if isinstance(page, discord.Embed)]
+
+    async def get_page(self, index: int) -> Optional[discord.Embed]:
+        """Gets a page, rendering it if it isn't cached.
+
+        Arguments:
+            index {int} -- The page's index.
+
+        Returns:
+            Optional[discord.Embed] -- The page, or None if there's no such page.
+        """
+        if index < 0 or (self.eof is not None and index > self.eof):
+            return None
+
+        extra_pages = self.extra_pages
+        if index < len(extra_pages):
+            return extra_pages[index]
+
+        page = self.pages.get(index)
+        if page is None:
+            chunk = await self.get_chunk(index - len(extra_pages))
+            if not chunk:
+                return None
+            page = self.render(index - len(extra_pages), chunk)
+            self.pages.set(index, page)
+
+        return page
+
+    async def get_chunk(self, index: int) -> Optional[List]:
+        """Gets a page's entries, finding the last page if they're the last ones.
+
+        Arguments:
+            index {int} -- The page's index among the entries' pages.
+
+        Returns:
+            Optional[List] -- The entries, or None if there's no such page.
+        """
+        if self.fetch_page is not None:
+            chunk = list(await self.fetch_page(index, self.length) or ())
+            is_last = len(chunk) < self.length
+        elif self.source is not None:
+            while len(self.chunks) <= index and not self.exhausted:
+                chunk = []
+                try:
+                    while len(chunk) < self.length:
+                        chunk.append(await self.source.__anext__())
+                except StopAsyncIteration:
+                    self.exhausted = True
+                if chunk:
+                    self.chunks.append(chunk)
+
+            chunk = self.chunks[index] if index < len(self.chunks) else []
+            is_last = self.exhausted and index >= len(self.chunks) - 1
+        else:
+            entries = self.entries or ()
+            chunk = entries[index * self.length : (index + 1) * self.length]
+            is_last = (index + 1) * self.length >= len(entries)
+
+        if is_last and self.eof is None:
+            last_chunk = index if chunk else index - 1
+            self.set_eof(len(self.extra_pages) + last_chunk)
+
+        return chunk or None
+
+    def set_eof(self, eof: int):
+        self.eof = eof
+        # The cached pages were titled without the page count.
+        self.pages.clear()
+
+    def page_count(self) -> Optional[int]:
+        """Returns how many pages the entries have, or None if it isn't known yet."""
+        if self.eof is None:
+            return None
+        return self.eof - len(self.extra_pages) + 1
+
+    def render(self, index: int, chunk: List) -> discord.Embed:
+        count = self.page_count()
+        page = discord.Embed(
+            title=f"{self.title} - {index + 1}/{count if count else '?'}",
+            color=self.colour,
+        )
+        page.description = self.formmater(chunk)
+
+        if self.footer:
+            page.set_footer(text=self.footer)
+        return page
 
-        self.controls = {"⏮": 0.0, "◀": -1, "⏹": "stop", "▶": +1, "⏭": None}
+    async def find_eof(self) -> int:
+        """Reads the entries until the last page is found.
+
+        Returns:
+            int -- The last page's index.
+        """
+        index = self.current - len(self.extra_pages)
+        while self.eof is None:
+            index += 1
+            await self.get_chunk(index)
+        return self.eof
 
     async def indexer(self, ctx, ctrl):
         if ctrl == "stop":
             ctx.bot.loop.create_task(self.stop_controller(self.base))
+            return
 
-        elif isinstance(ctrl, int):
-            self.current += ctrl
-            if self.current > self.eof or self.current < 0:
-                self.current -= ctrl
+        if ctrl is None:
+            index = self.eof if self.eof is not None else await self.find_eof()
+        elif ctrl == 0:
+            index = 0
         else:
-            self.current = int(ctrl)
+            index = self.current + ctrl
 
-    async def reaction_controller(self, ctx):
-        bot = ctx.bot
-        author = ctx.author
+        if await self.get_page(index) is not None:
+            self.current = index
 
-        self.base = await ctx.send(embed=self.pages[0])
+    async def on_reaction(self, react: discord.Reaction, user):
+        bot = self.ctx.bot
+        if str(react) not in self.controls.keys():
+            return
+        elif user.id == bot.user.id or user.id != self.ctx.author.id:
+            return
 
-        if len(self.pages) == 1:
-            await self.base.add_reaction("⏹")
-        else:
-            for reaction in self.controls:
-                try:
-                    await self.base.add_reaction(reaction)
-                except discord.HTTPException:
-                    return
-
-        def check(r, u):
-            if str(r) not in self.controls.keys():
-                return False
-            elif u.id == bot.user.id or r.message.id != self.base.id:
-                return False
-            elif u.id != author.id:
-                return False
-            return True
-
-        while True:
-            try:
-                react, user = await bot.wait_for(
-                    "reaction_add", check=check, timeout=self.timeout
-                )
-            except asyncio.TimeoutError:
-                return ctx.bot.loop.create_task(self.stop_controller(self.base))
-
-            control = self.controls.get(str(react))
-
-            try:
-                await self.base.remove_reaction(react, user)
-            except discord.HTTPException:
-                pass
+        control = self.controls.get(str(react))
+        manager.touch(self)
+
+        # Removing the reaction doesn't need to hold up changing the page.
+        bot.loop.create_task(self.remove_reaction(react, user))
 
+        async with self.lock:
             self.previous = self.current
-            await self.indexer(ctx, control)
+            await self.indexer(self.ctx, control)
 
             if self.previous == self.current:
-                continue
+                return
+            page = await self.get_page(self.current)
 
-            try:
-                await self.base.edit(embed=self.pages[self.current])
-            except KeyError:
-                pass
+        # Not awaited, so rapid page changes only send the latest page.
+        rest_scheduler.schedule_edit(self.base, embed=page)
 
-    async def stop_controller(self, message):
+    async def remove_reaction(self, react, user):
         try:
-            await message.delete()
+            await self.base.remove_reaction(react, user)
         except discord.HTTPException:
             pass
 
+    async def stop_controller(self, message):
+        manager.remove(self)
+        rest_scheduler.cancel_reactions(message)
         try:
-            self.controller.cancel()
-        except Exception:
+            await message.delete()
+        except discord.HTTPException:
             pass
 
+    def approximate_size(self) -> int:
+        """Returns roughly how many bytes the pages take up, as JSON."""
+        pages = self.extra_pages + self.pages.values()
+        return sum(len(json.dumps(page.to_dict())) for page in pages)
+
     def formmater(self, chunk):
         return "\n".join(
             f"{self.prepend}{self.fmt}{value}{self.fmt[::-1]}{self.append}"
@@ -144,27 +261,120 @@ class SimplePaginator:
         )
 
     async def paginate(self, ctx):
-        if self.extras:
-            self.pages = [p for p in self.extras if isinstance(p, discord.Embed)]
-
-        if self.entries:
-            chunks = [c async for c in pager(self.entries, self.length)]
-
-            for index, chunk in enumerate(chunks):
-                page = discord.Embed(
-                    title=f"{self.title} - {index + 1}/{len(chunks)}", color=self.colour
-                )
-                page.description = self.formmater(chunk)
-
-                if self.footer:
-                    page.set_footer(text=self.footer)
-                self.pages.append(page)
+        if self.source is None and self.fetch_page is None:
+            self.total = len(self.entries or ())
+        if self.total is not None:
+            chunks = -(-self.total // self.length)
+            self.set_eof(len(self.extra_pages) + chunks - 1)
 
-        if not self.pages:
+        if await self.get_page(0) is None:
             raise Exception(
                 "There must be enough data to create at least 1 page for pagination."
             )
 
-        self.eof = float(len(self.pages) - 1)
-        self.controls["⏭"] = self.eof
-        self.controller = ctx.bot.loop.create_task(self.reaction_controller(ctx))
+        self.ctx = ctx
+        self.base = await ctx.send(embed=await self.get_page(0))
+        # The manager routes the reactions to `on_reaction` until it's stopped.
+        manager.add(self)
+
+        if self.eof == 0:
+            rest_scheduler.add_reactions(self.base, ("⏹",))
+        else:
+            rest_scheduler.add_reactions(self.base, self.controls)
+
+
+class PaginatorManager:
+    """Owns the running paginators and routes their reactions to them.
+    When there are too many, the least recently used one is stopped, and a sweeper
+    stops the ones left unused for longer than their timeout.
+    """
+
+    def __init__(self, maxsize: int = 100, sweep_interval: float = 15.0) -> None:
+        self.maxsize = maxsize
+        self.sweep_interval = sweep_interval
+        self.evictions = 0
+
+        # Maps the paginator's message id to it, least recently used first.
+        self._paginators: "collections.OrderedDict[int, SimplePaginator]" = (
+            collections.OrderedDict()
+        )
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def add(self, paginator: SimplePaginator):
+        self._paginators[paginator.base.id] = paginator
+        paginator.last_used = time.monotonic()
+        reaction_dispatcher.dispatcher.add_callback(
+            paginator.base, paginator.on_reaction
+        )
+
+        while len(self._paginators) > self.maxsize:
+            _, oldest = self._paginators.popitem(last=False)
+            self.evictions += 1
+            self.stop(oldest)
+
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    def touch(self, paginator: SimplePaginator):
+        paginator.last_used = time.monotonic()
+        if paginator.base.id in self._paginators:
+            self._paginators.move_to_end(paginator.base.id)
+
+    def remove(self, paginator: SimplePaginator):
+        if paginator.base is None:
+            return
+        if self._paginators.get(paginator.base.id) is paginator:
+            del self._paginators[paginator.base.id]
+        reaction_dispatcher.dispatcher.remove_callback(paginator.base)
+
+    def stop(self, paginator: SimplePaginator):
+        # Removed right away, so it doesn't get any more reactions.
+        self.remove(paginator)
+        asyncio.ensure_future(paginator.stop_controller(paginator.base))
+
+    async def _sweep(self):
+        # Stops once there are no paginators left, `add` starts it again.
+        while self._paginators:
+            await asyncio.sleep(self.sweep_interval)
+            now = time.monotonic()
+            for paginator in list(self._paginators.values()):
+                if now - paginator.last_used > paginator.timeout:
+                    self.stop(paginator)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the manager's counters.
+
+        Returns:
+            Dict[str, int] -- The sessions, their approximate size and evictions.
+        """
+        return {
+            "sessions": len(self._paginators),
+            "maxsize": self.maxsize,
+            "bytes": sum(
+                paginator.approximate_size()
+                for paginator in self._paginators.values()
+            ),
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._paginators)
+
+
+manager = PaginatorManager()
+
+paginator_sessions = metrics.registry.gauge(
+    "paginator_sessions", "How many paginators are running."
+)
+paginator_bytes = metrics.registry.gauge(
+    "paginator_bytes", "Roughly how many bytes the paginators' pages take up."
+)
+
+
+def _collect_metrics():
+    stats = manager.stats()
+    paginator_sessions.set(stats["sessions"])
+    paginator_bytes.set(stats["bytes"])
+
+
+metrics.registry.add_collector("paginators", _collect_metrics)
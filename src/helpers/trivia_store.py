@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import random
+import sqlite3
+from typing import List, Optional
+
+import ujson
+
+default_path = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "trivia.sqlite3"
+)
+
+
+class TriviaStore:
+    """Keeps fetched trivia questions on disk, deduplicated by their question.
+    Nothing is read until `load` is awaited, and it's read off the event loop.
+    """
+
+    def __init__(
+        self, path: str = None, loop: asyncio.AbstractEventLoop = None
+    ) -> None:
+        self.path = path or default_path
+        self.loop = loop
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+        # Stored questions that haven't been served since this process started.
+        self._unserved: List[dict] = []
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._connection is not None
+
+    async def load(self):
+        """Opens the store and reads the stored questions."""
+        async with self._lock:
+            if self._connection is not None:
+                return
+            self._connection, self._unserved = await self._run(self._load)
+            random.shuffle(self._unserved)
+
+    def _load(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS trivia "
+            "(question TEXT PRIMARY KEY NOT NULL, data TEXT NOT NULL)"
+        )
+        connection.commit()
+        rows = connection.execute("SELECT data FROM trivia").fetchall()
+        return connection, [ujson.loads(data) for data, in rows]
+
+    def take(self, count: int) -> List[dict]:
+        """Takes up to `count` stored questions that haven't been served yet."""
+        if count <= 0:
+            return []
+        questions = self._unserved[-count:]
+        del self._unserved[-count:]
+        return questions
+
+    async def add(self, questions: List[dict]):
+        """Stores questions, ignoring any that are already stored.
+
+        Arguments:
+            questions {List[dict]} -- The trivia questions from opentdb.
+        """
+        if not questions:
+            return
+
+        async with self._lock:
+            if self._connection is None:
+                return
+            rows = [(trivia["question"], ujson.dumps(trivia)) for trivia in questions]
+            await self._run(self._add, rows)
+
+    def _add(self, rows: list):
+        self._connection.executemany("INSERT OR IGNORE INTO trivia VALUES (?, ?)", rows)
+        self._connection.commit()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def _run(self, function, *args):
+        loop = self.loop or asyncio.get_event_loop()
+        return await loop.run_in_executor(None, function, *args)
+
+    def __len__(self) -> int:
+        return len(self._unserved)
@@ -3,18 +3,29 @@
 """A Discord.py bot."""
 
 import asyncio
+import logging
 import os
 import re
-from typing import List
+import time
+from typing import List, Optional, Union
 
 import discord
 import discord.utils
+import jsonschema
 import yaml
 from discord.ext import commands
 
 from .globals import variables
 from .handlers import exit_handling
-from .helpers import database_helper, logs_helper, session_helper
+from .helpers import (
+    database_helper,
+    fuzzy_scoring,
+    logs_helper,
+    metrics,
+    session_helper,
+)
+from .helpers.command_index import CommandIndex
+from .helpers.message_filter import MessageFilter
 
 exit_handler = None
 
@@ -27,33 +38,101 @@ cogs = {
     "error_handling": "src.handlers.error_handling",
     "event_handling": "src.handlers.event_handling",
     "get_user": "src.helpers.fuzzy_user",
+    "reaction_dispatcher": "src.helpers.reaction_dispatcher",
 }
 
 
-class fake_ctx(object):
-    message: discord.Message = ...
+to_rot_command = re.compile("(.?(rotate|rot)(?! ))")
+
+# The optional config sections read here, the rest are read where they're used.
+config_schemes = {
+    "http": {
+        "type": "object",
+        "properties": {
+            "limit": {"type": "integer", "minimum": 0},
+            "limit_per_host": {"type": "integer", "minimum": 0},
+        },
+        "additionalProperties": False,
+    },
+    "fuzzy": {
+        "type": "object",
+        "properties": {"backend": {"type": ["string", "null"]}},
+        "additionalProperties": False,
+    },
+    "metrics": {
+        "type": "object",
+        "properties": {
+            "host": {"type": "string"},
+            "port": {"type": "integer", "minimum": 0, "maximum": 65535},
+            "path": {"type": "string", "pattern": "^/"},
+        },
+        "additionalProperties": False,
+    },
+}
 
+message_filter_seconds = metrics.registry.histogram(
+    "message_filter_seconds", "How long deciding if a message is a command takes."
+)
+get_prefix_seconds = metrics.registry.histogram(
+    "get_prefix_seconds", "How long finding a message's prefix takes."
+)
 
-async def get_prefix_wrapper(bot: commands.Bot, message: discord.Message) -> List[str]:
-    # I have to fake `commands.Context` because `get_context` requires the prefix,
-    # which would call this and create an infinite loop.
-    ctx: fake_ctx = fake_ctx()
-    ctx.message = message
-    prefixes = await database.get_prefix(ctx)
-    if not isinstance(prefixes, list):
-        prefixes = list(prefixes)
 
-    if (
-        isinstance(ctx.message.channel, discord.abc.PrivateChannel)
-        and "" not in prefixes
-    ):
-        # This enables the use of no prefixes in PrivateChannels by default.
-        prefixes.append("")
-    return commands.when_mentioned_or(*prefixes)(bot, message)
+async def get_prefix_wrapper(
+    bot: commands.Bot, message: discord.Message
+) -> Union[str, List[str]]:
+    with get_prefix_seconds.time():
+        matcher = await message_filter.get_matcher(message)
+        prefix = matcher.match(message.content)
+    if prefix is None:
+        return matcher.prefix_list
+    return prefix
+
 
+def get_config_section(config: dict, name: str) -> Optional[dict]:
+    """Gets an optional config section, falling back to the defaults if it's invalid.
+
+    Arguments:
+        config {dict} -- The loaded config.
+        name {str} -- The section's name, which has to be in `config_schemes`.
+
+    Returns:
+        Optional[dict] -- The section, or None if it's left out.
+    """
+    if name not in config:
+        return None
+
+    # An empty section is loaded as None.
+    section = config[name] or {}
+    try:
+        jsonschema.validate(section, config_schemes[name])
+    except jsonschema.exceptions.ValidationError:
+        logging.warning(f"The {name} config is invalid, using the defaults.")
+        return {}
+    return section
 
-bot = commands.Bot(case_insensitive=True, command_prefix=get_prefix_wrapper)
+
+class Quanta(commands.Bot):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.command_index = CommandIndex()
+        # Changes whenever commands may have been added or removed.
+        self.extensions_version = 0
+
+    def load_extension(self, name: str):
+        super().load_extension(name)
+        self.extensions_version += 1
+        self.command_index.rebuild(self)
+
+    def unload_extension(self, name: str):
+        super().unload_extension(name)
+        self.extensions_version += 1
+        self.command_index.rebuild(self)
+
+
+bot = Quanta(case_insensitive=True, command_prefix=get_prefix_wrapper)
 database = database_helper.Database()
+message_filter = MessageFilter(bot, database)
 
 
 @bot.event
@@ -63,15 +142,17 @@ async def on_message(message: discord.Message):
         and exit_handler is not None
         and not exit_handler.is_terminating()
     ):
-        prefixes = await get_prefix_wrapper(bot, message)
-        if not isinstance(prefixes, tuple):
-            prefixes = tuple(prefixes)
-        to_rot_command = re.compile("(.?(rotate|rot)(?! ))")
-        if message.content.startswith(prefixes):
-            # Add a space between rot or rotate and it's degree.
-            message.content = re.sub(
-                to_rot_command, lambda match: match.group(0) + " ", message.content
-            )
+        # Most messages aren't commands, so they're dropped before any lookups.
+        start_time = time.perf_counter()
+        prefix = await message_filter.filter(message)
+        message_filter_seconds.observe(time.perf_counter() - start_time)
+        if prefix is None:
+            return
+
+        # Add a space between rot or rotate and it's degree.
+        message.content = to_rot_command.sub(
+            lambda match: match.group(0) + " ", message.content
+        )
         await bot.process_commands(message)
 
 
@@ -92,6 +173,7 @@ if __name__ == "__main__":
     variables.database = database
     variables.bot = bot
     variables.exit_handler = exit_handler
+    variables.message_filter = message_filter
 
     # The help command has to be removed before the cogs are loaded.
     bot.remove_command("help")
@@ -103,6 +185,15 @@ if __name__ == "__main__":
     with open(config_path, "r") as config_file:
         config = yaml.safe_load(config_file)
 
+    fuzzy_config = get_config_section(config, "fuzzy") or {}
+    fuzzy_scoring.configure(fuzzy_config.get("backend", None))
+    session_helper.configure(**(get_config_section(config, "http") or {}))
+
+    # Metrics are only served when the section is configured.
+    metrics_config = get_config_section(config, "metrics")
+    if metrics_config is not None:
+        loop.run_until_complete(metrics.start_server(**metrics_config))
+
     bot_info = config["bot_info"]
     token = bot_info["token"]
 
@@ -111,6 +202,7 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         loop.run_until_complete(bot.logout())
     finally:
+        loop.run_until_complete(metrics.stop_server())
         loop.run_until_complete(session_helper.close_session())
         loop.run_until_complete(database.close(warn=False))
         bot._do_cleanup()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import asyncio
+import unittest
+
+from aiohttp import test_utils, web
+
+from src.helpers import session_helper
+
+
+class FetchTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = web.Application()
+        app.router.add_get("/", self._respond)
+        self.server = test_utils.TestServer(app)
+        await self.server.start_server()
+        self.url = str(self.server.make_url("/"))
+
+    async def asyncTearDown(self):
+        await session_helper.close_session()
+        await self.server.close()
+        session_helper._host_semaphores.clear()
+        session_helper.configure(limit_per_host=10)
+
+    @staticmethod
+    async def _respond(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def test_fetch_without_a_per_host_limit(self):
+        session_helper.configure(limit_per_host=0)
+
+        responses = await asyncio.wait_for(
+            asyncio.gather(*(session_helper.fetch(self.url) for _ in range(3))), 5
+        )
+
+        self.assertEqual([response.status for response in responses], [200] * 3)
+        self.assertEqual(responses[0].text(), "ok")
+
+    async def test_stream_without_a_per_host_limit(self):
+        session_helper.configure(limit_per_host=0)
+
+        async def read():
+            async with session_helper.stream(self.url) as response:
+                return await response.text()
+
+        self.assertEqual(await asyncio.wait_for(read(), 5), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()